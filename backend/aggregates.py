@@ -0,0 +1,158 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# The incremental stores below (and the ledger, rollups, top-K index, sketches and DuckDB engine)
+# share one contract: rows are applied in TransactionID order, each once, and `watermark` is the
+# last ID applied. A single record is applied only when it is the next ID; a record past a gap
+# would move the watermark over rows not applied yet, so it is left for the next add_frame.
+
+def is_next(txn_id, watermark):
+    """True if a single record with `txn_id` can be applied to a store at `watermark`."""
+    return txn_id == watermark + 1
+
+
+def rows_after(df, watermark):
+    """
+    The rows of `df` after `watermark`. `df` must be sorted by TransactionID (the sync buffer
+    appends in that order), so this is a binary search and a slice, not a mask over every row.
+    """
+    start = int(np.searchsorted(df['TransactionID'].to_numpy(), watermark, side='right'))
+    return df.iloc[start:]
+
+
+class Totals:
+    """Running sums for one aggregation key (a day, channel, region or product)."""
+    __slots__ = ('revenue', 'cost', 'quantity', 'count')
+
+    def __init__(self):
+        self.revenue = 0.0
+        self.cost = 0.0
+        self.quantity = 0
+        self.count = 0
+
+    def add(self, revenue, cost, quantity):
+        self.revenue += revenue
+        self.cost += cost
+        self.quantity += quantity
+        self.count += 1
+
+    @property
+    def profit(self):
+        return self.revenue - self.cost
+
+
+def _date_key(timestamp):
+    """Day key matching the old `Timestamp.dt.date.astype(str)` grouping."""
+    if timestamp is None or timestamp is pd.NaT:
+        return None
+    if not isinstance(timestamp, pd.Timestamp):
+        timestamp = pd.Timestamp(timestamp)
+    return str(timestamp.date())
+
+
+class AggregateStore:
+    """
+    In-process running aggregates for the dashboard.
+    Every transaction is applied once (tracked by TransactionID) in O(1),
+    so serving the dashboard no longer depends on the size of the table.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.watermark = 0  # Highest TransactionID applied so far
+        self.totals = Totals()
+        self.daily = {}
+        self.channels = {}
+        self.regions = {}
+        self.products = {}
+        self.last_timestamp = None
+
+    def _apply(self, txn_id, timestamp, product, region, channel, quantity, revenue, cost):
+        self.watermark = txn_id
+
+        self.totals.add(revenue, cost, quantity)
+        for bucket, key in ((self.daily, _date_key(timestamp)),
+                            (self.channels, channel),
+                            (self.regions, region),
+                            (self.products, product)):
+            if key is None:
+                continue
+            entry = bucket.get(key)
+            if entry is None:
+                entry = bucket[key] = Totals()
+            entry.add(revenue, cost, quantity)
+
+        if timestamp is not None and (self.last_timestamp is None or timestamp > self.last_timestamp):
+            self.last_timestamp = timestamp
+        return True
+
+    def add(self, record):
+        """Applies a single transaction dict (as built by transaction.generate_single_transaction)."""
+        txn_id = record.get('TransactionID')
+        if txn_id is None:
+            return False
+        revenue = float(record.get('TotalPrice') or 0.0)
+        cost = record.get('TotalCost')
+        cost = float(cost) if cost is not None else revenue * 0.7
+        timestamp = record.get('Timestamp')
+        if timestamp is not None and not isinstance(timestamp, pd.Timestamp):
+            timestamp = pd.Timestamp(timestamp)
+        with self._lock:
+            if not is_next(int(txn_id), self.watermark):
+                return False
+            return self._apply(
+                int(txn_id), timestamp,
+                record.get('ProductID'), record.get('Region'), record.get('Channel', 'Webstore'),
+                int(record.get('Quantity') or 0), revenue, cost,
+            )
+
+    def add_frame(self, df):
+        """Applies only the rows of `df` (sorted by TransactionID) newer than the watermark. Returns how many."""
+        if df.empty or 'TransactionID' not in df.columns:
+            return 0
+        with self._lock:
+            new_rows = rows_after(df, self.watermark)
+            for row in zip(new_rows['TransactionID'], new_rows['Timestamp'], new_rows['ProductID'],
+                           new_rows['Region'], new_rows['Channel'], new_rows['Quantity'],
+                           new_rows['TotalPrice'], new_rows['TotalCost']):
+                txn_id, timestamp, product, region, channel, quantity, revenue, cost = row
+                self._apply(int(txn_id), timestamp, product, region, channel,
+                            int(quantity), float(revenue), float(cost))
+            return len(new_rows)
+
+    def snapshot(self):
+        """Serializes the current state in the /api/dashboard-data layout."""
+        with self._lock:
+            total_revenue = self.totals.revenue
+            gross_profit = self.totals.profit
+            return {
+                "total_revenue": total_revenue,
+                "gross_profit": gross_profit,
+                "profit_margin": (gross_profit / total_revenue * 100) if total_revenue > 0 else 0,
+                "count": self.totals.count,
+                "last_timestamp": self.last_timestamp,
+                "trends": [
+                    {"Date": day, "Revenue": t.revenue, "Profit": t.profit}
+                    for day, t in sorted(self.daily.items())
+                ],
+                "channels": [
+                    {"Channel": channel, "TotalPrice": t.revenue}
+                    for channel, t in sorted(self.channels.items())
+                ],
+                "regions": [
+                    {"Region": region, "TotalPrice": t.revenue}
+                    for region, t in sorted(self.regions.items())
+                ],
+                "products": [
+                    {
+                        "ProductID": product,
+                        "TotalSales": t.revenue,
+                        "Totalprofit": t.profit,
+                        "Margin": (t.profit / t.revenue * 100) if t.revenue else 0,
+                    }
+                    for product, t in sorted(self.products.items())
+                ],
+            }
@@ -1,10 +1,13 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context, make_response, g, has_request_context
 from flask_cors import CORS
 import datetime
 import pandas as pd
 import transaction
 import os
 import json
+import functools
+import threading
+import time
 
 app = Flask(__name__)
 CORS(app)
@@ -13,50 +16,218 @@ CORS(app)
 
 
 import db_utils
+import aggregates
+import live_updates
+import inventory_ledger
+import time_rollups
+import top_k
+import sketches
+import shared_snapshot
+import serialization
+import metrics
+
+# Seed / fix the table once at startup instead of on every read (disable with SEED_ON_STARTUP=0)
+if os.environ.get("SEED_ON_STARTUP", "1") != "0":
+    db_utils.run_startup_migrations()
+
+# Running dashboard aggregates, fed incrementally from fetched rows and in-process transactions.
+# ANALYTICS_ENGINE=duckdb answers them with SQL over a persistent DuckDB database instead.
+ANALYTICS_ENGINE = os.environ.get("ANALYTICS_ENGINE", "pandas")
+aggregate_store = None
+if ANALYTICS_ENGINE == "duckdb":
+    import duckdb_engine
+    try:
+        aggregate_store = duckdb_engine.DuckDBEngine()
+    except Exception as e:
+        print(f"Error opening DuckDB ({e}); using the pandas aggregates")
+if aggregate_store is None:
+    aggregate_store = aggregates.AggregateStore()
+transaction.register_listener(aggregate_store.add)
+
+# Stock per product, updated per sale and per restock; emits In Stock/Low Stock/Out of Stock transitions
+ledger = inventory_ledger.InventoryLedger(transaction.WEARS)
+transaction.register_listener(ledger.add)
+
+# Per-minute/hour/day/week rollups behind the time-range queries
+trend_rollups = time_rollups.TimeRollups()
+transaction.register_listener(trend_rollups.add)
+
+# Best sellers by revenue/quantity/profit, globally and per Region/Channel
+best_sellers_index = top_k.TopKIndex()
+transaction.register_listener(best_sellers_index.add)
+
+# Quantile (KLL) and distinct-count (HyperLogLog) sketches for the dashboard's distribution metrics
+sketch_store = sketches.SketchStore()
+transaction.register_listener(sketch_store.add)
+
+# Serialized bodies of the versioned read endpoints, keyed by path + query string
+_body_cache = {}
+BODY_CACHE_MAX_ENTRIES = 64
+
+def versioned(version_fn):
+    """
+    Conditional GET for a read endpoint. The ETag is the data version from `version_fn`;
+    a matching If-None-Match gets a 304 without running the view, and a repeated request
+    for an unchanged version reuses the serialized body instead of recomputing it.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_fn()
+            # Compressed bodies carry the encoding in their ETag (see compress_response)
+            matched = next((tag for tag in (version, f"{version}-gzip", f"{version}-br")
+                            if request.if_none_match.contains(tag)), None)
+            if matched is not None:
+                response = app.response_class(status=304)
+                version = matched
+            else:
+                key = request.full_path
+                cached = _body_cache.get(key)
+                if cached is not None and cached[0] == version:
+                    response = app.response_class(cached[1], mimetype='application/json')
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    # A view that rendered from a snapshot with its own version reports it here
+                    version = g.pop('response_version', version)
+                    if response.status_code == 200:
+                        if len(_body_cache) >= BODY_CACHE_MAX_ENTRIES:
+                            _body_cache.clear()
+                        _body_cache[key] = (version, response.get_data())
+            response.set_etag(version)
+            # Browsers may keep the body but must revalidate it every time
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
+
+def render(payload):
+    """JSON response for a read endpoint via the fast encoder; ?format=columnar turns row lists into column arrays."""
+    with metrics.stage("serialize"):
+        body = serialization.encode(payload, request.endpoint, columnar=request.args.get('format') == 'columnar')
+    return app.response_class(body, mimetype='application/json')
+
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    metrics.begin_request()
+    g.profile = metrics.profiler.start()
+
+# Registered before compress_response so it runs after it (after_request hooks run in reverse)
+@app.after_request
+def record_request_timing(response):
+    """Request latency histogram, the Server-Timing header, and the slow-request profile if enabled."""
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    metrics.profiler.finish(g.profile, request.full_path, elapsed)
+    if response.is_streamed:
+        return response  # /api/stream: the latency of a long-lived stream says nothing
+    metrics.observe("http_request_seconds", elapsed, endpoint=request.endpoint or "unmatched", status=response.status_code)
+    response.headers['Server-Timing'] = metrics.server_timing(elapsed)
+    return response
+
+# Compressed bodies of ETagged responses, keyed by path + query string, ETag and encoding
+_compressed_cache = {}
+
+@app.after_request
+def compress_response(response):
+    """Negotiated gzip/brotli for JSON bodies of at least COMPRESS_MIN_BYTES; records bytes per endpoint."""
+    if response.status_code != 200 or response.mimetype != 'application/json' or response.direct_passthrough \
+            or 'Content-Encoding' in response.headers:
+        return response
+    body = response.get_data()
+    response.vary.add('Accept-Encoding')
+    encoding = serialization.negotiate(request.accept_encodings)
+    etag = response.get_etag()[0]
+    key = (request.full_path, etag, encoding)
+    cached = _compressed_cache.get(key) if etag else None
+    started = time.perf_counter()
+    if cached is None:
+        with metrics.stage("compress"):
+            cached = serialization.compress(body, encoding)
+        if etag:
+            if len(_compressed_cache) >= BODY_CACHE_MAX_ENTRIES:
+                _compressed_cache.clear()
+            _compressed_cache[key] = cached
+    compressed, used = cached
+    if used is not None:
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = used
+        if etag:
+            # A different representation needs a different strong validator
+            response.set_etag(f"{etag}-{used}")
+    serialization.response_stats.record_response(request.endpoint, len(body), len(compressed),
+                                                 time.perf_counter() - started)
+    return response
+
+def request_snapshot():
+    """
+    (transactions, restock totals, pipeline flag, stored reorder points) as read once for the
+    current request, so the ETag version and the body are computed from the same data.
+    Outside a request: a fresh read.
+    """
+    if has_request_context() and 'data_snapshot' in g:
+        return g.data_snapshot
+    # Independent reads: fetch them side by side
+    df, restock_data, reorder_points = db_utils.gather(db_utils.get_cached_transactions_async(),
+                                                       db_utils.get_cached_restock_data_async(),
+                                                       db_utils.get_cached_reorder_points_async())
+    snapshot = (df, restock_data, db_utils.get_cached_pipeline_status(), reorder_points or {})
+    if has_request_context():
+        g.data_snapshot = snapshot
+    return snapshot
 
 def get_data():
-    """Fetches data from Supabase via db_utils."""
-    return db_utils.fetch_all_transactions()
+    """Returns the transactions snapshot (cached, single-flight in db_utils) for this request."""
+    return request_snapshot()[0]
 
-@app.route('/api/dashboard-data', methods=['GET'])
-def get_dashboard_data():
-    df = get_data()
-    
+def data_version():
+    df, restock_data, pipeline_active, _ = request_snapshot()
+    return db_utils.data_version(df, restock_data, pipeline_active)
+
+# With SHARED_SNAPSHOT_PATH set, one elected worker per host computes the live state and publishes
+# it to a memory-mapped snapshot; the other workers serve the default views from it without
+# fetching or aggregating anything themselves. (The publisher is created once the builders exist.)
+shared = shared_snapshot.SharedSnapshot() if shared_snapshot.SHARED_SNAPSHOT_PATH else None
+publisher = None
+
+def shared_live_state():
+    """The published {"version", "state"} when another worker is the aggregator, else None (compute locally)."""
+    if publisher is None:
+        return None
+    if has_request_context() and 'shared_snapshot' in g:
+        return g.shared_snapshot  # One read per request, so the ETag and the body agree
+    publisher.ensure_started()
+    snapshot = None if publisher.is_leader else shared.read()
+    if has_request_context():
+        g.shared_snapshot = snapshot
+    return snapshot
+
+def default_view():
+    """True when the request has no parameters besides ?format= (the views the snapshot holds)."""
+    return all(name == 'format' for name in request.args)
+
+def state_version():
+    """ETag version for the live views: the published snapshot's, or the local data version."""
+    snapshot = shared_live_state() if default_view() else None
+    if snapshot is not None:
+        return snapshot['version']
+    return inventory_version()
+
+@metrics.timed("build_dashboard")
+def build_dashboard(df, pipeline_active):
+    """Builds the /api/dashboard-data payload, or None when there is no data."""
     if df.empty:
-        return jsonify({"error": "No data available"}), 500
+        return None
 
-    # KPIs
-    total_revenue = float(df['TotalPrice'].sum())
-    total_cost = float(df['TotalCost'].sum())
-    gross_profit = total_revenue - total_cost
-    profit_margin = (gross_profit / total_revenue * 100) if total_revenue > 0 else 0
-
-    # Daily Trends
-    df['Date'] = df['Timestamp'].dt.date.astype(str)
-    daily_sales = df.groupby('Date').agg(
-        Revenue=('TotalPrice', 'sum'),
-        Profit=('TotalPrice', lambda x: x.sum() - df.loc[x.index, 'TotalCost'].sum())
-    ).reset_index()
-    
-    # Channel Sales
-    channel_sales = df.groupby('Channel')['TotalPrice'].sum().reset_index()
-    
-    # Regional Sales
-    regional_sales = df.groupby('Region')['TotalPrice'].sum().reset_index()
-    
-    # Product Analysis (Scatter)
-    product_stats = df.groupby('ProductID').agg(
-        TotalSales=('TotalPrice', 'sum'),
-        Totalprofit=('TotalPrice', lambda x: x.sum() - df.loc[x.index, 'TotalCost'].sum())
-    ).reset_index()
-    product_stats['Margin'] = (product_stats['Totalprofit'] / product_stats['TotalSales'] * 100).fillna(0)
+    # Apply only the rows we have not seen yet; the store keeps running sums
+    aggregate_store.add_frame(df)
+    aggregates_state = aggregate_store.snapshot()
+    sketch_store.add_frame(df)
 
     # Pipeline Status
-    # Sort by timestamp
-    df = df.sort_values(by='Timestamp', ascending=False)
-    
     # Calculate time since last transaction
-    last_transaction_time = df.iloc[0]['Timestamp']
+    last_transaction_time = aggregates_state['last_timestamp']
     
     # Supabase returns TZ-aware, so we must make now() TZ-aware or strip TZ
     now = datetime.datetime.now()
@@ -66,77 +237,137 @@ def get_dashboard_data():
          last_transaction_time = last_transaction_time.replace(tzinfo=None)
          
     time_since_last = (now - last_transaction_time).total_seconds()
-    # pipeline_status is now fetched from DB
-    pipeline_active = db_utils.get_pipeline_status()
     pipeline_status_text = "Active" if pipeline_active else "Inactive"
 
-    return jsonify({
+    return {
         "kpi": {
-            "total_revenue": total_revenue,
-            "gross_profit": gross_profit,
-            "profit_margin": profit_margin,
+            "total_revenue": aggregates_state['total_revenue'],
+            "gross_profit": aggregates_state['gross_profit'],
+            "profit_margin": aggregates_state['profit_margin'],
             "data_quality_alert_status": "Operational", # Mock
             "data_quality_alerts": 0,
             "pipeline_status": pipeline_status_text
         },
-        "trends": daily_sales.to_dict(orient='records'),
-        "channels": channel_sales.to_dict(orient='records'),
-        "regions": regional_sales.to_dict(orient='records'),
-        "products": product_stats.to_dict(orient='records')
-    })
+        "trends": aggregates_state['trends'],
+        "channels": aggregates_state['channels'],
+        "regions": aggregates_state['regions'],
+        "products": aggregates_state['products'],
+        "sketches": sketch_store.summary()
+    }
 
-@app.route('/api/inventory')
-def get_inventory():
-    df = get_data()
+@metrics.timed("build_inventory")
+def build_inventory(df, restock_data, reorder_points):
+    """Builds the /api/inventory rows from the ledger, most critical first."""
     if df.empty:
-        return jsonify([])
-    
-    # Initial Stock Base
-    INITIAL_STOCK = 200
-    
-    # Load Restock Data from Supabase
-    restock_data = db_utils.get_restock_data()
+        return []
 
-    # Calculate Sold Quantity per Product
-    sold_stats = df.groupby('ProductID')['Quantity'].sum().reset_index()
-    
-    # Use the shared WEARS list from transaction.py
-    all_product_ids = transaction.WEARS
-    
-    inventory_data = []
-    
-    # Create map for quick lookup
-    sold_map = dict(zip(sold_stats['ProductID'], sold_stats['Quantity']))
-    
-    for pid in all_product_ids:
-        sold = sold_map.get(pid, 0)
-        added_stock = restock_data.get(pid, 0)
-        total_initial = INITIAL_STOCK + added_stock
-        remaining = total_initial - sold
-        
-        status = "In Stock"
-        if remaining < 50: 
-            status = "Low Stock"
-        if remaining <= 0:
-            status = "Out of Stock"
-            remaining = 0 # Sustain non-negative
-            
-        inventory_data.append({
-            "id": pid,             # Name is the ID now
-            "name": pid,           # Name is the ID now
-            "initial_stock": total_initial,
-            "sold": int(sold),
-            "remaining": int(remaining),
-            "status": status,
-            "status_color": "text-green-400" if status == "In Stock" else ("text-yellow-400" if status == "Low Stock" else "text-red-500")
-        })
-        
-    # Sort by remaining stock (Ascending: 0 -> Max) to show critical items first
-    inventory_data.sort(key=lambda x: x['remaining'])
+    # Bring the ledger up to date: new sales since its watermark, restocks from the maintained
+    # totals, reorder points from storage
+    ledger.add_frame(df)
+    ledger.sync_restocks(restock_data)
+    ledger.sync_reorder_points(reorder_points)
+    return ledger.rows()
 
-    response = jsonify(inventory_data)
-    response.headers.add("Cache-Control", "no-cache, no-store, must-revalidate")
-    return response
+def inventory_version():
+    """Data version plus the stored reorder points (both change the inventory rows)."""
+    return f"{data_version()}.r{db_utils.fingerprint(request_snapshot()[3])}"
+
+def _best_seller_rows(k, metric, dimension, group):
+    rows = []
+    for product_id, value, error in best_sellers_index.top(k, metric, dimension, group):
+        row = {
+            "product_id": product_id,
+            metric: int(value) if metric == "quantity" else float(value),
+            "name": product_id # ProductID is now the name (e.g. "Classic White T-Shirt")
+        }
+        if best_sellers_index.mode == "approximate":
+            row["error"] = float(error)
+        rows.append(row)
+    return rows
+
+@metrics.timed("build_best_sellers")
+def build_best_sellers(df, k=5, metric="revenue", dimension="global", group=None):
+    """
+    Builds the /api/best-sellers payload: the top `k` products by `metric`. Globally that is a list;
+    per region or channel it is {group: list} (or just the list for one `group`).
+    """
+    if df.empty:
+        return [] if dimension == "global" or group else {}
+
+    best_sellers_index.add_frame(df)
+    if dimension == "global" or group:
+        return _best_seller_rows(k, metric, dimension, group)
+    return {name: _best_seller_rows(k, metric, dimension, name) for name in best_sellers_index.groups(dimension)}
+
+def parse_trend_args(args, default_granularity="day"):
+    """Reads ?from=&to=&granularity=&points= (ISO timestamps or epoch seconds). Raises ValueError."""
+    granularity = args.get('granularity', default_granularity)
+    if granularity not in time_rollups.GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(time_rollups.GRANULARITIES)}")
+    bounds = []
+    for name in ('from', 'to'):
+        value = args.get(name)
+        if value:
+            value = pd.Timestamp(int(value), unit='s') if value.isdigit() else pd.Timestamp(value)
+        bounds.append(value or None)
+    points = int(args.get('points', time_rollups.CHART_MAX_POINTS))
+    if points < 3:
+        raise ValueError("points must be at least 3")
+    return granularity, bounds[0], bounds[1], points
+
+@metrics.timed("build_trends")
+def build_trends(df, granularity, start, end, points):
+    """Time-bucketed revenue/profit for [start, end], downsampled to at most `points` rows."""
+    trend_rollups.add_frame(df)
+    series, buckets = trend_rollups.series(granularity, start, end, points)
+    return {
+        "granularity": granularity,
+        "from": start.isoformat() if start is not None else None,
+        "to": end.isoformat() if end is not None else None,
+        "buckets": buckets,
+        "downsampled": len(series) < buckets,
+        "series": series,
+    }
+
+@app.route('/api/dashboard-data', methods=['GET'])
+@versioned(state_version)
+def get_dashboard_data():
+    snapshot = shared_live_state() if default_view() else None
+    if snapshot is not None:
+        dashboard = snapshot['state']['dashboard']
+        if dashboard is None:
+            return jsonify({"error": "No data available"}), 500
+        return render(dashboard)
+    df, _, pipeline_active, _ = request_snapshot()
+    dashboard = build_dashboard(df, pipeline_active)
+    if dashboard is None:
+        return jsonify({"error": "No data available"}), 500
+    if any(name in request.args for name in ('from', 'to', 'granularity')):
+        # Trends for the requested window from the rollups instead of every day in the history
+        try:
+            dashboard["trends"] = build_trends(df, *parse_trend_args(request.args))["series"]
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    return render(dashboard)
+
+@app.route('/api/trends')
+@versioned(data_version)
+def get_trends():
+    """Revenue/profit series: ?from=&to=&granularity=minute|hour|day|week&points=<max chart points>."""
+    try:
+        params = parse_trend_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return render(build_trends(get_data(), *params))
+
+@app.route('/api/inventory')
+@versioned(state_version)
+def get_inventory():
+    snapshot = shared_live_state() if default_view() else None
+    if snapshot is not None:
+        return render(snapshot['state']['inventory'])
+    df, restock_data, _, reorder_points = request_snapshot()
+    return render(build_inventory(df, restock_data, reorder_points))
 
 @app.route('/api/inventory/restock', methods=['POST'])
 def restock_product():
@@ -167,28 +398,125 @@ def restock_product():
     success = db_utils.add_restock_record(product_id, quantity)
     
     if success:
+        ledger.sync_restocks(db_utils.get_cached_restock_data())
         return jsonify({"success": True, "message": f"Restocked {product_id}"})
     else:
         return jsonify({"error": "Failed to log restock"}), 500
 
+INGEST_REQUIRED_FIELDS = ('TransactionID', 'Timestamp', 'ProductID', 'Quantity', 'TotalPrice')
+_ingest_lock = threading.Lock()
+
+def validate_ingest(records, max_id):
+    """Error message for an invalid ingest batch, or None. IDs must be new: above `max_id` and unique."""
+    seen = set()
+    for record in records:
+        if not isinstance(record, dict):
+            return "Each transaction must be an object"
+        missing = [field for field in INGEST_REQUIRED_FIELDS if record.get(field) is None]
+        if missing:
+            return f"Transaction is missing {', '.join(missing)}"
+        txn_id = record['TransactionID']
+        if isinstance(txn_id, bool) or not isinstance(txn_id, int):
+            return "TransactionID must be an integer"
+        if txn_id <= max_id:
+            return f"TransactionID {txn_id} is not above the current maximum {max_id}"
+        if txn_id in seen:
+            return f"Duplicate TransactionID {txn_id}"
+        seen.add(txn_id)
+        try:
+            int(record['Quantity'])
+            float(record['TotalPrice'])
+            pd.Timestamp(record['Timestamp'])
+        except (TypeError, ValueError):
+            return f"Transaction {txn_id} has an invalid Quantity, TotalPrice or Timestamp"
+    return None
+
+@app.route('/api/transactions', methods=['POST'])
+def ingest_transactions():
+    """
+    Bulk ingest (e.g. the load generator's api sink): upserts the rows and feeds the live aggregates.
+    Only new TransactionIDs are accepted; anything at or below the stored maximum would be skipped
+    by the incremental stores, so it is rejected. The stores apply a pushed row only when it is
+    next in sequence; otherwise (e.g. before the first read) the next delta sync applies it in order.
+    """
+    records = request.json
+    if isinstance(records, dict):
+        records = [records]
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "Expected a list of transactions"}), 400
+
+    with _ingest_lock:
+        max_id = db_utils.get_max_transaction_id()
+        if max_id is None:
+            return jsonify({"error": "Could not read the current max TransactionID"}), 503
+        error = validate_ingest(records, max(max_id, db_utils.transaction_sync.watermark))
+        if error:
+            return jsonify({"error": error}), 400
+
+        records = sorted(records, key=lambda record: record['TransactionID'])
+        if not db_utils.upsert_transactions(records):
+            return jsonify({"error": "Failed to store transactions"}), 500
+        # The next read syncs the new rows, so the data version moves with the pushed aggregates
+        db_utils.transactions_cache.invalidate()
+
+    for record in records:
+        transaction.notify_listeners(record)
+    return jsonify({"success": True, "count": len(records)})
+
+@app.route('/api/inventory/reorder-points', methods=['GET', 'POST'])
+def reorder_points():
+    """GET the reorder point per product, or POST {"product_id": ..., "level": ...} to change one."""
+    if request.method == 'POST':
+        data = request.json or {}
+        product_id = data.get('product_id')
+        try:
+            level = int(data.get('level'))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid level"}), 400
+        if product_id not in ledger.status or level < 0:
+            return jsonify({"error": "Invalid data"}), 400
+        # Stored, so every worker (and the next process) uses it, not just this ledger
+        if not db_utils.set_reorder_point(product_id, level):
+            return jsonify({"error": "Failed to store reorder point"}), 500
+    ledger.sync_reorder_points(db_utils.get_cached_reorder_points())
+    return jsonify({pid: ledger.reorder_point(pid) for pid in ledger.status})
+
+@app.route('/api/inventory/events')
+def get_stock_events():
+    """Stock status transitions, oldest first; pass ?since=<seq> to get only newer ones."""
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"error": "Invalid since"}), 400
+    snapshot = shared_live_state()
+    if snapshot is not None:
+        # Only the aggregator feeds its ledger: serve the events it published
+        return render([event for event in snapshot['state'].get('stock_events') or [] if event['seq'] > since])
+    df, restock_data, _, reorder_points = request_snapshot()
+    build_inventory(df, restock_data, reorder_points)  # Bring the ledger up to date first
+    return render(ledger.recent_events(since))
+
+@app.route('/api/inventory/restocks')
+def get_restock_history():
+    """Restock audit trail, optionally filtered with ?product_id=."""
+    return render(db_utils.get_restock_logs(request.args.get('product_id')))
+
 @app.route('/api/best-sellers')
+@versioned(state_version)
 def get_best_sellers():
-    df = get_data()
-    if df.empty:
-        return jsonify([])
-        
-    # Top 5 by Revenue
-    top_products = df.groupby('ProductID')['TotalPrice'].sum().sort_values(ascending=False).head(5).reset_index()
-    
-    result = []
-    for _, row in top_products.iterrows():
-        result.append({
-            "product_id": row['ProductID'],
-            "revenue": float(row['TotalPrice']),
-            "name": row['ProductID'] # ProductID is now the name (e.g. "Classic White T-Shirt")
-        })
-        
-    return jsonify(result)
+    """?k=5&metric=revenue|quantity|profit&dimension=global|region|channel[&group=North]"""
+    snapshot = shared_live_state() if default_view() else None
+    if snapshot is not None:
+        return render(snapshot['state']['best_sellers'])
+    try:
+        k = int(request.args.get('k', 5))
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+    metric = request.args.get('metric', 'revenue')
+    dimension = request.args.get('dimension', 'global')
+    if not 1 <= k <= 100 or metric not in top_k.METRICS or dimension not in top_k.DIMENSIONS:
+        return jsonify({"error": f"Expected 1 <= k <= 100, metric in {top_k.METRICS}, dimension in {tuple(top_k.DIMENSIONS)}"}), 400
+    return render(build_best_sellers(get_data(), k, metric, dimension, request.args.get('group')))
 
 
 @app.route('/api/pipeline/status', methods=['GET', 'POST'])
@@ -203,10 +531,125 @@ def pipeline_status():
         else:
             return jsonify({"error": "Failed to update status"}), 500
         
-    # GET request
-    active = db_utils.get_pipeline_status()
+    return get_pipeline_status()
+
+@versioned(db_utils.pipeline_version)
+def get_pipeline_status():
+    active = db_utils.get_cached_pipeline_status()
     return jsonify({"active": active})
 
+def build_live_state():
+    """Everything the streaming clients render, computed from one snapshot."""
+    df, restock_data, pipeline_active, reorder_points = request_snapshot()
+    return {
+        "dashboard": build_dashboard(df, pipeline_active),
+        "inventory": build_inventory(df, restock_data, reorder_points),
+        "best_sellers": build_best_sellers(df),
+    }
+
+def build_shared_state():
+    """The live state plus the recent stock events, published for the workers that are not the aggregator."""
+    state = build_live_state()
+    state["stock_events"] = ledger.recent_events()
+    return state
+
+def live_change_token():
+    """Cheap fingerprint of the inputs; the live state is only rebuilt when it changes."""
+    return inventory_version()
+
+if shared is not None:
+    publisher = shared_snapshot.SnapshotPublisher(shared, build_shared_state, live_change_token)
+    transaction.register_listener(publisher.poke)
+    ledger.subscribe(publisher.poke)
+
+def current_live_state():
+    snapshot = shared_live_state()
+    if snapshot is None:
+        return build_live_state()
+    # Stock events have their own endpoint: keep them out of the streamed state
+    return {key: value for key, value in snapshot['state'].items() if key != 'stock_events'}
+
+def current_change_token():
+    snapshot = shared_live_state()
+    return snapshot['version'] if snapshot is not None else live_change_token()
+
+broadcaster = live_updates.Broadcaster(current_live_state, current_change_token)
+transaction.register_listener(broadcaster.poke)
+ledger.subscribe(broadcaster.poke)
+
+# Sections of /api/snapshot and where they live in the live state
+SNAPSHOT_SECTIONS = {
+    "kpi": ("dashboard", "kpi"),
+    "trends": ("dashboard", "trends"),
+    "channels": ("dashboard", "channels"),
+    "regions": ("dashboard", "regions"),
+    "products": ("dashboard", "products"),
+    "sketches": ("dashboard", "sketches"),
+    "inventory": ("inventory",),
+    "best_sellers": ("best_sellers",),
+}
+
+@app.route('/api/snapshot')
+@versioned(current_change_token)
+def get_snapshot():
+    """
+    Several views in one response: ?sections=kpi,trends,inventory,... (default: all of them).
+    They all come from the same live state, built from one fetch, so the numbers agree.
+    """
+    names = [name for name in request.args.get('sections', ','.join(SNAPSHOT_SECTIONS)).split(',') if name]
+    unknown = [name for name in names if name not in SNAPSHOT_SECTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown sections {unknown}; expected some of {list(SNAPSHOT_SECTIONS)}"}), 400
+    version, state = broadcaster.latest()
+    g.response_version = version  # The ETag is the version of the state the sections come from
+    sections = {}
+    for name in names:
+        value = state
+        for key in SNAPSHOT_SECTIONS[name]:
+            value = value.get(key) if value is not None else None
+        sections[name] = value
+    return render({"version": version, "sections": sections})
+
+@app.route('/api/stream')
+def stream():
+    """Server-Sent Events: a full snapshot on connect, then only the changes as data arrives."""
+    return Response(stream_with_context(broadcaster.stream()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    stats = db_utils.cache_stats()
+    if shared is not None:
+        stats.append(dict(shared.stats(), is_aggregator=publisher.is_leader, publishes=publisher.publishes))
+    stats.append(serialization.response_stats.stats())
+    return jsonify(stats)
+
+def _app_metrics():
+    for endpoint, entry in serialization.response_stats.stats()["endpoints"].items():
+        labels = {"endpoint": endpoint}
+        yield "response_serialize_seconds_total", "counter", labels, entry["serialize_seconds"]
+        yield "response_json_bytes_total", "counter", labels, entry["json_bytes"]
+        yield "response_wire_bytes_total", "counter", labels, entry["wire_bytes"]
+    yield "stream_subscribers", "gauge", {}, broadcaster.subscribers
+    if shared is not None:
+        yield "shared_snapshot_is_aggregator", "gauge", {}, int(publisher.is_leader)
+        yield "shared_snapshot_publishes_total", "counter", {}, publisher.publishes
+        yield "shared_snapshot_read_retries_total", "counter", {}, shared.retries
+
+metrics.register_collector(_app_metrics)
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of this worker's counters and histograms."""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/debug/profiles')
+def get_slow_request_profiles():
+    """Most frequent stacks of recent slow requests (needs PROFILE_SLOW_REQUEST_MS)."""
+    if not metrics.profiler.enabled:
+        return jsonify({"error": "Set PROFILE_SLOW_REQUEST_MS to enable the profiler"}), 404
+    return jsonify(list(metrics.profiler.recent))
+
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.json
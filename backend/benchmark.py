@@ -0,0 +1,179 @@
+"""
+Benchmarks the read endpoints against an in-process Supabase stand-in (fake_supabase.py).
+
+    python benchmark.py                         # 10k, 100k and 1M rows
+    python benchmark.py --sizes 10000 --repeat 50
+    python benchmark.py --compare benchmark_results/<older>.json
+
+Each dataset size runs in a fresh subprocess so caches and peak memory do not leak between runs.
+Results are written to benchmark_results/<commit>.json.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENDPOINTS = ['/api/dashboard-data', '/api/inventory', '/api/best-sellers']
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = "benchmark_results"
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _max_rss_kib():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform == "darwin" else rss  # bytes on macOS, KiB on Linux
+
+
+def _time_request(client, url):
+    started = time.perf_counter()
+    response = client.get(url)
+    elapsed = (time.perf_counter() - started) * 1000
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} returned {response.status_code}")
+    return elapsed, len(response.data)
+
+
+def run_size(size, repeat):
+    """Runs inside the per-size subprocess: seeds the fake, imports the app, times every endpoint."""
+    os.environ.setdefault("SEED_ON_STARTUP", "0")
+    os.environ.setdefault("SNAPSHOT_TTL_SECONDS", "0")   # Every request goes through the sync path
+
+    import db_utils
+    import fake_supabase
+
+    fake = fake_supabase.FakeSupabase()
+    fake.seed_defaults()
+    seed_started = time.perf_counter()
+    fake.seed_sales(size)
+    seed_seconds = time.perf_counter() - seed_started
+    db_utils.create_client = lambda url, key: fake
+
+    import app as backend_app
+    client = backend_app.app.test_client()
+    results = {"rows": size, "seed_seconds": round(seed_seconds, 3), "endpoints": {}}
+
+    for url in ENDPOINTS:
+        # Cold: first request after startup (the full paginated fetch lands on the first endpoint).
+        # Peak memory comes from the RSS high-water mark; tracemalloc would distort the timing.
+        fake.calls.clear()
+        rss_before = _max_rss_kib()
+        cold_ms, payload_bytes = _time_request(client, url)
+        rss_after = _max_rss_kib()
+        cold_peak_kib = (rss_after - rss_before) if rss_before is not None else None
+        cold_calls = sum(fake.calls.values())
+
+        # Warm: repeated polls with no new data (what most dashboard polls look like)
+        fake.calls.clear()
+        warm = [_time_request(client, url)[0] for _ in range(repeat)]
+        warm_calls = sum(fake.calls.values()) / repeat
+
+        # Uncached body: unique query string, so the payload is rebuilt and reserialized every time
+        uncached = [_time_request(client, f"{url}?bench={i}")[0] for i in range(repeat)]
+
+        tracemalloc.start()
+        _time_request(client, f"{url}?bench=peak")
+        _, warm_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results["endpoints"][url] = {
+            "cold_ms": round(cold_ms, 3),
+            "cold_rss_growth_kib": cold_peak_kib,
+            "cold_upstream_calls": cold_calls,
+            "warm_p50_ms": round(statistics.median(warm), 3),
+            "warm_p95_ms": round(_percentile(warm, 95), 3),
+            "warm_upstream_calls": round(warm_calls, 2),
+            "uncached_p50_ms": round(statistics.median(uncached), 3),
+            "uncached_p95_ms": round(_percentile(uncached, 95), 3),
+            "uncached_peak_kib": round(warm_peak / 1024, 1),
+            "payload_bytes": payload_bytes,
+        }
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, previous_path):
+    """Prints the change in warm/uncached p50 latency against an earlier results file."""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nvs {previous.get('commit')} ({previous_path}):")
+    for size, result in current["results"].items():
+        before = previous["results"].get(size)
+        if not before:
+            continue
+        for url, stats in result["endpoints"].items():
+            old = before["endpoints"].get(url)
+            if not old:
+                continue
+            for metric in ("cold_ms", "warm_p50_ms", "uncached_p50_ms"):
+                change = (stats[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+                print(f"  {size:>8} {url:<22} {metric:<16} {old[metric]:>10.2f} -> {stats[metric]:>10.2f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend read-endpoint benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Results file (default benchmark_results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to diff against")
+    parser.add_argument("--single", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        # Child process: print this size's results as JSON on the last line
+        print(json.dumps(run_size(args.single, args.repeat)))
+        return
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size:,} rows...")
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), "--single", str(size), "--repeat", str(args.repeat)],
+            text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        result = json.loads(output.strip().splitlines()[-1])
+        report["results"][str(size)] = result
+        for url, stats in result["endpoints"].items():
+            print(f"  {url:<22} cold {stats['cold_ms']:>9.1f} ms  warm p50 {stats['warm_p50_ms']:>7.2f} ms  "
+                  f"uncached p50 {stats['uncached_p50_ms']:>7.2f} ms  peak {stats['uncached_peak_kib']:>8.0f} KiB")
+
+    path = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
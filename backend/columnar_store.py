@@ -0,0 +1,188 @@
+import json
+import os
+import sys
+from datetime import date, datetime
+
+import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Configuration
+HISTORY_DIR = os.environ.get("COLUMNAR_STORE_DIR", "history")
+META_FILENAME = "_meta.json"
+# Low-cardinality strings stored dictionary-encoded (an int index per row instead of the string)
+DICTIONARY_COLUMNS = ['ProductID', 'Region', 'Channel']
+
+
+def is_available():
+    return pa is not None
+
+
+def _schema():
+    return pa.schema([
+        ('TransactionID', pa.int64()),
+        ('Timestamp', pa.timestamp('us')),
+        ('ProductID', pa.dictionary(pa.int32(), pa.string())),
+        ('Quantity', pa.int32()),
+        ('PricePerUnit', pa.float64()),
+        ('CostPerUnit', pa.float64()),
+        ('TotalPrice', pa.float64()),
+        ('TotalCost', pa.float64()),
+        ('Region', pa.dictionary(pa.int32(), pa.string())),
+        ('Channel', pa.dictionary(pa.int32(), pa.string())),
+    ])
+
+
+def _as_date(value):
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    return pd.Timestamp(value).date()
+
+
+class ColumnarStore:
+    """
+    Local transaction history as Parquet files partitioned by day:
+        <root>/date=YYYY-MM-DD/part-<first id>-<last id>.parquet
+    Reads prune partitions by date range and columns by name, and memory-map the files,
+    so a trend chart or single-region query only touches the days and columns it needs.
+    """
+
+    def __init__(self, root=HISTORY_DIR):
+        if pa is None:
+            raise ImportError("pyarrow is required for the columnar store (pip install pyarrow)")
+        self.root = root
+        self.schema = _schema()
+        os.makedirs(root, exist_ok=True)
+
+    # Metadata
+    def _meta_path(self):
+        return os.path.join(self.root, META_FILENAME)
+
+    def max_transaction_id(self):
+        """Highest TransactionID stored (0 when empty); used to append incrementally."""
+        try:
+            with open(self._meta_path()) as f:
+                return int(json.load(f).get('max_transaction_id', 0))
+        except (OSError, ValueError):
+            return 0
+
+    def _set_max_transaction_id(self, value):
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'max_transaction_id': int(value)}, f)
+        os.replace(tmp_path, self._meta_path())
+
+    # Partitions
+    def partitions(self, start=None, end=None):
+        """(day, directory) pairs within [start, end], oldest first."""
+        start, end = _as_date(start), _as_date(end)
+        result = []
+        for name in sorted(os.listdir(self.root)):
+            if not name.startswith("date="):
+                continue
+            day = date.fromisoformat(name[5:])
+            if (start is None or day >= start) and (end is None or day <= end):
+                result.append((day, os.path.join(self.root, name)))
+        return result
+
+    def _files(self, start=None, end=None):
+        for _, directory in self.partitions(start, end):
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".parquet"):
+                    yield os.path.join(directory, name)
+
+    # Writes
+    def write(self, df):
+        """Appends rows newer than the stored max TransactionID. Returns the number of rows written."""
+        if df.empty:
+            return 0
+        df = df[df['TransactionID'] > self.max_transaction_id()]
+        if df.empty:
+            return 0
+        df = df.copy()
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+        if getattr(df['Timestamp'].dt, 'tz', None) is not None:
+            df['Timestamp'] = df['Timestamp'].dt.tz_localize(None)
+        for column in self.schema.names:
+            if column not in df.columns:
+                df[column] = None
+        df = df[self.schema.names].sort_values('TransactionID')
+
+        for day, day_rows in df.groupby(df['Timestamp'].dt.date):
+            directory = os.path.join(self.root, f"date={day.isoformat()}")
+            os.makedirs(directory, exist_ok=True)
+            first_id, last_id = int(day_rows['TransactionID'].iloc[0]), int(day_rows['TransactionID'].iloc[-1])
+            path = os.path.join(directory, f"part-{first_id:012d}-{last_id:012d}.parquet")
+            table = pa.Table.from_pandas(day_rows, schema=self.schema, preserve_index=False)
+            pq.write_table(table, path, use_dictionary=DICTIONARY_COLUMNS, compression='zstd')
+
+        self._set_max_transaction_id(df['TransactionID'].iloc[-1])
+        return len(df)
+
+    def compact(self, day):
+        """Merges the part files of one day into a single file (many small appends -> one read)."""
+        directory = os.path.join(self.root, f"date={_as_date(day).isoformat()}")
+        files = sorted(f for f in os.listdir(directory) if f.endswith(".parquet"))
+        ranges = {f: (int(f.split('-')[1]), int(f.split('-')[2].split('.')[0])) for f in files}
+        # Parts inside another file's ID range were already merged (left over by an interrupted compact)
+        covered = [f for f in files
+                   if any(g != f and ranges[g][0] <= ranges[f][0] and ranges[f][1] <= ranges[g][1] for g in files)]
+        for f in covered:
+            os.remove(os.path.join(directory, f))
+        files = [f for f in files if f not in covered]
+        if len(files) < 2:
+            return
+        table = pa.concat_tables([pq.read_table(os.path.join(directory, f), memory_map=True) for f in files])
+        name = f"part-{ranges[files[0]][0]:012d}-{ranges[files[-1]][1]:012d}.parquet"
+        merged = os.path.join(directory, name + ".tmp")
+        pq.write_table(table, merged, use_dictionary=DICTIONARY_COLUMNS, compression='zstd')
+        # Publish the merged file before dropping the parts, so the day's rows are never missing
+        os.replace(merged, os.path.join(directory, name))
+        for f in files:
+            if f != name:
+                os.remove(os.path.join(directory, f))
+
+    # Reads
+    def read_table(self, columns=None, start=None, end=None, filters=None):
+        """
+        Reads an Arrow table. `columns` prunes columns, `start`/`end` (dates) prune day
+        partitions, and `filters` (pyarrow DNF, e.g. [('Region', '==', 'North')]) prunes rows.
+        """
+        tables = [pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+                  for path in self._files(start, end)]
+        if not tables:
+            return self.schema.empty_table() if columns is None else \
+                pa.schema([self.schema.field(c) for c in columns]).empty_table()
+        return pa.concat_tables(tables)
+
+    def read(self, columns=None, start=None, end=None, filters=None):
+        """Same as read_table but returns a DataFrame (dictionary columns become categoricals)."""
+        return self.read_table(columns, start, end, filters).to_pandas()
+
+
+def migrate_csv(csv_paths, root=HISTORY_DIR):
+    """Converts CSV history (e.g. the transaction log segments) into the columnar store."""
+    store = ColumnarStore(root)
+    written = 0
+    for path in csv_paths:
+        df = pd.read_csv(path, parse_dates=['Timestamp'])
+        rows = store.write(df)
+        written += rows
+        print(f"{path}: {rows} rows migrated")
+    for day, _ in store.partitions():
+        store.compact(day)
+    return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        import transaction
+        paths = sys.argv[2:] or transaction.log_segments(transaction.CSV_FILENAME)
+        total = migrate_csv(paths)
+        print(f"Migrated {total} rows into {HISTORY_DIR}/")
+    else:
+        print("Usage: python columnar_store.py migrate [csv ...]")
@@ -1,5 +1,10 @@
+import contextvars
+import hashlib
+import json
 import os
 import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import pandas as pd
 try:
     from supabase import create_client, Client
@@ -8,6 +13,11 @@ except ImportError:
     Client = None
 import random
 from datetime import datetime, timedelta
+import metrics
+from snapshot_cache import SnapshotCache
+from pipeline_control import PipelineControl
+from transaction_buffer import TransactionBuffer
+from storage import StorageBackend, SQLiteStorage
 
 # Configuration
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://nqhevfseowjpdtzibgew.supabase.co")
@@ -16,18 +26,55 @@ SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://nqhevfseowjpdtzibgew.supa
 # The key below is a fallback (Public Anon Key provided by user)
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "sb_publishable_bysiJIf5J3EiN0RHg0Y7xA_-4HZbncQ")
 
+# Which storage backend serves reads and writes: "supabase" (cloud) or "sqlite" (local, offline)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "supabase")
+
 TABLE_NAME = "sales_data"
 RESTOCK_TABLE = "restock_logs"
+RESTOCK_TOTALS_TABLE = "restock_totals"
 PIPELINE_TABLE = "pipeline_status"
+REORDER_POINTS_TABLE = "reorder_points"
+
+# How long (seconds) read endpoints may share one fetched snapshot
+SNAPSHOT_TTL_SECONDS = float(os.environ.get("SNAPSHOT_TTL_SECONDS", "2.0"))
+# Rows per keyset page (PostgREST caps responses at 1000 rows by default)
+FETCH_PAGE_SIZE = int(os.environ.get("FETCH_PAGE_SIZE", "1000"))
+DB_IO_THREADS = int(os.environ.get("DB_IO_THREADS", "8"))  # Threads for concurrent upstream reads
+
+# One long-lived client per process: its HTTP connection pool (keep-alive) is reused by every helper
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
 
 def get_supabase_client():
-    if create_client:
-        try:
-            return create_client(SUPABASE_URL, SUPABASE_KEY)
-        except Exception as e:
-            print(f"Error creating Supabase client: {e}")
-            return None
-    return None
+    """
+    Returns the process-wide Supabase client, creating it on first use.
+    The underlying HTTP client is thread-safe, so request threads share it.
+    It is re-created after a fork so gunicorn workers never share sockets with the master.
+    """
+    global _client, _client_pid
+    if not create_client:
+        return None
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            try:
+                with metrics.stage("supabase_client"):
+                    _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+                _client_pid = pid
+            except Exception as e:
+                print(f"Error creating Supabase client: {e}")
+                return None
+    return _client
+
+def reset_supabase_client():
+    """Drops the cached client so the next call builds a fresh one (e.g. after credentials change)."""
+    global _client, _client_pid
+    with _client_lock:
+        _client = None
+        _client_pid = None
 
 def map_record_to_db_schema(record):
     """Maps internal PascalCase record to DB snake_case schema."""
@@ -55,12 +102,26 @@ WEARS = [
     "Maxi Skirt", "Aviator Sunglasses", "Leather Belt", "Beanie Hat"
 ]
 
+def execute(query, table, operation):
+    """Runs a Supabase query builder, counting and timing the call per table and operation."""
+    started = time.perf_counter()
+    try:
+        with metrics.stage("supabase"):
+            return query.execute()
+    except Exception:
+        metrics.inc("upstream_errors_total", table=table, operation=operation)
+        raise
+    finally:
+        metrics.inc("upstream_calls_total", table=table, operation=operation)
+        metrics.observe("upstream_call_seconds", time.perf_counter() - started, table=table, operation=operation)
+
+@metrics.timed("initialize_db_if_empty")
 def initialize_db_if_empty(supabase):
     """Checks if table is empty and seeds it. Also fixes generic names if found."""
     try:
         # Check if we need to fix generic names (Product 1, Product 2...)
         # We check TransactionID 1. If it exists and ProductID is 'Product 0', we overwrite the seed data.
-        response = supabase.table(TABLE_NAME).select("*").eq("TransactionID", 1).limit(1).execute()
+        response = execute(supabase.table(TABLE_NAME).select("*").eq("TransactionID", 1).limit(1), TABLE_NAME, "select")
         
         need_reseed = False
         if not response.data:
@@ -91,136 +152,442 @@ def initialize_db_if_empty(supabase):
                 # Convert to DB Schema
                 initial_data.append(map_record_to_db_schema(record))
                 
-            supabase.table(TABLE_NAME).upsert(initial_data).execute()
+            execute(supabase.table(TABLE_NAME).upsert(initial_data), TABLE_NAME, "upsert")
             print("Seeding/Fix complete.")
             
     except Exception as e:
         print(f"Error seeding DB: {e}")
 
-def fetch_all_transactions():
-    """Fetches all records, handles mixed schema, and polyfills missing data."""
-    try:
+_migrations_done = False
+_migrations_lock = threading.Lock()
+
+def run_startup_migrations():
+    """
+    One-time startup step: creates/seeds the selected storage backend (for Supabase: seeds an
+    empty table and fixes generic product names). Kept out of the read path so dashboard
+    fetches cost a single round-trip.
+    """
+    global _migrations_done
+    with _migrations_lock:
+        if _migrations_done:
+            return
+        try:
+            get_storage().migrate()
+        except Exception as e:
+            print(f"Error running migrations: {e}")
+            return
+        _migrations_done = True
+
+def _prepare_record(record):
+    """Copy of a record with its timestamp as an ISO string (JSON-safe)."""
+    record = dict(record)
+    if hasattr(record.get('Timestamp'), 'isoformat'):
+        record['Timestamp'] = record['Timestamp'].isoformat()
+    return record
+
+class SupabaseStorage(StorageBackend):
+    """Supabase (PostgREST) backend. Uses the pooled process-wide client and the snake_case DB schema."""
+    name = "supabase"
+
+    def _client(self):
         supabase = get_supabase_client()
-        
-        # Auto-seed if empty
-        initialize_db_if_empty(supabase)
-        
-        # Select * returns whatever columns exist
-        response = supabase.table(TABLE_NAME).select("*").order("Timestamp", desc=True).limit(2000).execute()
-        data = response.data
-        if not data:
-            return pd.DataFrame()
-            
-        df = pd.DataFrame(data)
-        
-        # SCHEMA MAPPING (Mixed DB -> Pascal App)
-        rename_map = {
-            'price_per_unit': 'PricePerUnit',
-            'total_price': 'TotalPrice',
-            'region': 'Region',
-            'product_id': 'ProductID',
-            # 'Timestamp' and 'Quantity' seem to match Pascal based on error hints
+        if supabase is None:
+            raise RuntimeError("Supabase client unavailable (is the supabase package installed?)")
+        return supabase
+
+    def migrate(self):
+        initialize_db_if_empty(self._client())
+
+    def iter_transaction_pages(self, after_id, page_size):
+        """
+        Streams raw rows in TransactionID order, one page at a time.
+        Uses keyset pagination (TransactionID > last seen id) rather than offsets,
+        so every page is an index range scan no matter how deep into the table we are.
+        """
+        supabase = self._client()
+        last_id = after_id
+        while True:
+            response = execute(supabase.table(TABLE_NAME).select("*")
+                               .gt("TransactionID", last_id)
+                               .order("TransactionID")
+                               .limit(page_size), TABLE_NAME, "select")
+            rows = response.data
+            if not rows:
+                return
+            yield rows
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]['TransactionID']
+
+    def max_transaction_id(self):
+        rows = execute(self._client().table(TABLE_NAME).select("TransactionID")
+                       .order("TransactionID", desc=True).limit(1), TABLE_NAME, "select").data
+        return rows[0]['TransactionID'] if rows else 0
+
+    def insert_transaction(self, record):
+        execute(self._client().table(TABLE_NAME).insert(map_record_to_db_schema(_prepare_record(record))),
+                TABLE_NAME, "insert")
+
+    def upsert_transactions(self, records):
+        db_records = [map_record_to_db_schema(_prepare_record(record)) for record in records]
+        execute(self._client().table(TABLE_NAME).upsert(db_records, on_conflict="TransactionID"), TABLE_NAME, "upsert")
+
+    def add_restock(self, product_id, quantity, timestamp):
+        data = {
+            "product_id": product_id,
+            "quantity": quantity,
+            "timestamp": timestamp
         }
-        df.rename(columns=rename_map, inplace=True)
-        
-        # Ensure timestamp is datetime
-        if 'Timestamp' in df.columns:
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-            
-        # POLYFILLS for missing columns
-        if 'TotalCost' not in df.columns:
-            if 'TotalPrice' in df.columns:
-                df['TotalCost'] = df['TotalPrice'] * 0.7
-            else:
-                df['TotalCost'] = 0.0
-                
-        if 'Channel' not in df.columns:
-            df['Channel'] = 'Webstore'
-            
-        if 'ProductID' not in df.columns and 'product_id' not in df.columns:
-             pass # Hopefully ProductID came through
+        execute(self._client().table(RESTOCK_TABLE).insert(data), RESTOCK_TABLE, "insert")
+
+    def restock_logs(self, product_id=None):
+        query = self._client().table(RESTOCK_TABLE).select("*")
+        if product_id is not None:
+            query = query.eq("product_id", product_id)
+        return execute(query.order("id"), RESTOCK_TABLE, "select").data or []
+
+    def restock_totals(self):
+        # Maintained by the restock_logs trigger in setup.sql: one row per product
+        try:
+            rows = execute(self._client().table(RESTOCK_TOTALS_TABLE).select("product_id,total_quantity"),
+                           RESTOCK_TOTALS_TABLE, "select").data
+        except Exception as e:
+            print(f"restock_totals unavailable ({e}); summing restock_logs. Run setup.sql to create it.")
+            return super().restock_totals()
+        return {row['product_id']: row['total_quantity'] for row in rows or []}
+
+    def get_pipeline_status(self):
+        # We assume ID 1 is the status row
+        response = execute(self._client().table(PIPELINE_TABLE).select("active").eq("id", 1).single(),
+                           PIPELINE_TABLE, "select")
+        if response.data:
+            return response.data.get('active', True)
+        return True
+
+    def set_pipeline_status(self, active, updated_at):
+        # Upsert ID 1
+        data = {
+            "id": 1,
+            "active": active,
+            "updated_at": updated_at
+        }
+        execute(self._client().table(PIPELINE_TABLE).upsert(data), PIPELINE_TABLE, "upsert")
 
+    def reorder_points(self):
+        rows = execute(self._client().table(REORDER_POINTS_TABLE).select("product_id,level"),
+                       REORDER_POINTS_TABLE, "select").data
+        return {row['product_id']: row['level'] for row in rows or []}
+
+    def set_reorder_point(self, product_id, level, updated_at):
+        data = {"product_id": product_id, "level": int(level), "updated_at": updated_at}
+        execute(self._client().table(REORDER_POINTS_TABLE).upsert(data, on_conflict="product_id"),
+                REORDER_POINTS_TABLE, "upsert")
+
+STORAGE_BACKENDS = {
+    "supabase": SupabaseStorage,
+    "sqlite": SQLiteStorage,
+}
+_storages = {}
+_storages_lock = threading.Lock()
+
+def get_storage(name=None):
+    """Returns the (shared) storage backend instance; defaults to STORAGE_BACKEND."""
+    name = name or STORAGE_BACKEND
+    storage = _storages.get(name)
+    if storage is None:
+        with _storages_lock:
+            storage = _storages.get(name)
+            if storage is None:
+                if name not in STORAGE_BACKENDS:
+                    raise ValueError(f"Unknown storage backend '{name}' (expected one of {sorted(STORAGE_BACKENDS)})")
+                storage = _storages[name] = STORAGE_BACKENDS[name]()
+    return storage
+
+def iter_transaction_pages(after_id=0, page_size=None):
+    """Streams raw rows with TransactionID > after_id from the storage backend, one page at a time."""
+    return get_storage().iter_transaction_pages(after_id, page_size or FETCH_PAGE_SIZE)
+
+def fetch_transactions_since(after_id=0, page_size=None):
+    """Fetches every record with TransactionID > after_id (the whole table for 0)."""
+    try:
+        with metrics.stage("fetch"):
+            df = get_storage().read_transactions(after_id, page_size or FETCH_PAGE_SIZE)
+        metrics.inc("rows_fetched_total", len(df), storage=STORAGE_BACKEND)
         return df
     except Exception as e:
-        print(f"Error fetching data from Supabase: {e}")
+        print(f"Error fetching transactions: {e}")
         return pd.DataFrame()
 
-def insert_transaction(record):
+def get_max_transaction_id():
+    """The highest TransactionID in storage (0 when empty), or None if it cannot be read."""
+    try:
+        return int(get_storage().max_transaction_id())
+    except Exception as e:
+        print(f"Error reading max TransactionID: {e}")
+        return None
+
+def fetch_all_transactions():
+    """Fetches all records (paginated), handles mixed schema, and polyfills missing data."""
+    return fetch_transactions_since(0)
+
+class TransactionSync:
+    """
+    Keeps recent transactions in memory (a compact columnar TransactionBuffer) and extends
+    them with only the rows past its watermark (the highest TransactionID seen), so each
+    poll downloads the delta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buffer = TransactionBuffer()
+        self.watermark = 0
+
+    def refresh(self):
+        """Fetches rows newer than the watermark, appends them and returns the live rows as a frame."""
+        with self._lock:
+            delta = fetch_transactions_since(self.watermark)
+            if not delta.empty and 'TransactionID' in delta.columns:
+                with metrics.stage("buffer_append"):
+                    self.buffer.append_frame(delta)
+                self.watermark = int(delta['TransactionID'].max())
+            return self.buffer.frame()
+
+    def reset(self):
+        """Forgets the local rows; the next refresh re-downloads the full table."""
+        with self._lock:
+            self.buffer = TransactionBuffer()
+            self.watermark = 0
+
+def insert_transaction(record, storage=None):
     """Inserts a single transaction record with schema mapping."""
     try:
-        supabase = get_supabase_client()
-        # Ensure timestamp is string for JSON serialization
-        if hasattr(record['Timestamp'], 'isoformat'):
-            record['Timestamp'] = record['Timestamp'].isoformat()
-            
-        db_record = map_record_to_db_schema(record)
-            
-        supabase.table(TABLE_NAME).insert(db_record).execute()
+        (storage or get_storage()).insert_transaction(record)
+        transactions_cache.invalidate()
         return True
     except Exception as e:
         print(f"Error inserting transaction: {e}")
         return False
 
+def upsert_transactions(records, storage=None):
+    """Bulk-upserts transaction records in one request, keyed on TransactionID (safe to replay)."""
+    if not records:
+        return True
+    try:
+        (storage or get_storage()).upsert_transactions(records)
+        transactions_cache.invalidate()
+        return True
+    except Exception as e:
+        print(f"Error upserting {len(records)} transactions: {e}")
+        return False
+
 def add_restock_record(product_id, quantity):
-    """Logs a restock event to Supabase."""
+    """Logs a restock event."""
     try:
-        supabase = get_supabase_client()
-        data = {
-            "product_id": product_id,
-            "quantity": quantity,
-            "timestamp": datetime.now().isoformat()
-        }
-        supabase.table(RESTOCK_TABLE).insert(data).execute()
+        get_storage().add_restock(product_id, quantity, datetime.now().isoformat())
+        # Write through to the cached totals so readers see it without re-reading the table
+        restock_cache.update(lambda totals: {**totals, product_id: totals.get(product_id, 0) + quantity})
         return True
     except Exception as e:
         print(f"Error adding restock record: {e}")
         return False
 
 def get_restock_data():
-    """Aggregates total restocked quantity per product from logs."""
+    """Total restocked quantity per product, from the maintained restock_totals summary."""
     try:
-        supabase = get_supabase_client()
-        # Fetch all restock logs
-        response = supabase.table(RESTOCK_TABLE).select("*").execute()
-        data = response.data
-        
-        restock_map = {}
-        for row in data:
-            pid = row.get('product_id')
-            qty = row.get('quantity', 0)
-            restock_map[pid] = restock_map.get(pid, 0) + qty
-            
-        return restock_map
+        return get_storage().restock_totals()
     except Exception as e:
         print(f"Error fetching restock data: {e}")
         return {}
 
+def get_reorder_points():
+    """Stored per-product reorder points; None on error so the cached ones are kept."""
+    try:
+        return get_storage().reorder_points()
+    except Exception as e:
+        print(f"Error fetching reorder points: {e}")
+        return None
+
+def set_reorder_point(product_id, level):
+    """Stores a product's reorder point (every worker's ledger picks it up from storage)."""
+    try:
+        get_storage().set_reorder_point(product_id, int(level), datetime.now().isoformat())
+    except Exception as e:
+        print(f"Error storing reorder point: {e}")
+        return False
+    reorder_cache.update(lambda points: {**points, product_id: int(level)})
+    return True
+
+def get_restock_logs(product_id=None):
+    """The full restock history (audit trail), optionally for one product."""
+    try:
+        return get_storage().restock_logs(product_id)
+    except Exception as e:
+        print(f"Error fetching restock logs: {e}")
+        return []
+
 def get_pipeline_status():
     """Gets the active status of the pipeline."""
     try:
-        supabase = get_supabase_client()
-        # We assume ID 1 is the status row
-        response = supabase.table(PIPELINE_TABLE).select("active").eq("id", 1).single().execute()
-        if response.data:
-            return response.data.get('active', True)
-        return True
+        return get_storage().get_pipeline_status()
     except Exception as e:
         print(f"Error getting pipeline status: {e}")
         # Default to True if table missing or error, so it doesn't break
         return True
 
+_pipeline_control = None
+_pipeline_control_lock = threading.Lock()
+
+def get_pipeline_control():
+    """The process-wide pipeline control channel (created on first use)."""
+    global _pipeline_control
+    if _pipeline_control is None:
+        with _pipeline_control_lock:
+            if _pipeline_control is None:
+                # Raw storage read: a failed read must not look like a stored "active"
+                _pipeline_control = PipelineControl(loader=lambda: get_storage().get_pipeline_status())
+    return _pipeline_control
+
 def set_pipeline_status(active):
-    """Updates the pipeline status."""
+    """
+    Updates the pipeline status. Storage is the source of record, so it is written first; the
+    control channel (state file + notification) then reaches local processes immediately and
+    is best-effort, since other processes also resync from storage.
+    """
     try:
-        supabase = get_supabase_client()
-        # Upsert ID 1
-        data = {
-            "id": 1,
-            "active": active,
-            "updated_at": datetime.now().isoformat()
-        }
-        supabase.table(PIPELINE_TABLE).upsert(data).execute()
-        return True
+        get_storage().set_pipeline_status(active, datetime.now().isoformat())
     except Exception as e:
-        print(f"Error setting pipeline status: {e}")
+        print(f"Error storing pipeline status: {e}")
         return False
+    try:
+        get_pipeline_control().set_active(active)
+    except Exception as e:
+        print(f"Error updating pipeline control: {e}")
+    return True
+
+# Shared snapshots for the read endpoints (one delta fetch per TTL window, however many pollers)
+transaction_sync = TransactionSync()
+transactions_cache = SnapshotCache(transaction_sync.refresh, ttl=SNAPSHOT_TTL_SECONDS, name="transactions")
+restock_cache = SnapshotCache(get_restock_data, ttl=SNAPSHOT_TTL_SECONDS, name="restock", track_changes=True)
+reorder_cache = SnapshotCache(get_reorder_points, ttl=SNAPSHOT_TTL_SECONDS, name="reorder_points",
+                              track_changes=True)
+
+def get_cached_transactions():
+    """Returns the shared transactions snapshot. Treat it as read-only."""
+    return transactions_cache.get()
+
+def get_cached_restock_data():
+    """Returns the shared per-product restock totals. Treat it as read-only."""
+    return restock_cache.get()
+
+def get_cached_reorder_points():
+    """Returns the shared stored reorder points ({} until they could be read). Treat it as read-only."""
+    return reorder_cache.get() or {}
+
+def get_cached_pipeline_status():
+    """Returns the pipeline status flag from the control channel (never a database read)."""
+    return get_pipeline_control().is_active()
+
+# Futures-based variants: independent upstream reads run side by side on a small pool, so a
+# handler needing several of them waits for the slowest instead of the sum. Fresh cached values
+# come back as already-completed futures without a thread hop. Don't wait on these from inside
+# a pool task (the pool is bounded).
+_io_executor = None
+_io_executor_pid = None
+_io_executor_lock = threading.Lock()
+
+def get_io_executor():
+    """The process-wide thread pool for upstream reads (recreated after fork)."""
+    global _io_executor, _io_executor_pid
+    pid = os.getpid()
+    if _io_executor is not None and _io_executor_pid == pid:
+        return _io_executor
+    with _io_executor_lock:
+        if _io_executor is None or _io_executor_pid != pid:
+            _io_executor = ThreadPoolExecutor(max_workers=DB_IO_THREADS, thread_name_prefix="db-io")
+            _io_executor_pid = pid
+    return _io_executor
+
+def submit_io(fn, *args, **kwargs):
+    """Runs fn(*args, **kwargs) on the I/O pool and returns its Future."""
+    # In the caller's context, so stages timed on the pool still land in its Server-Timing
+    return get_io_executor().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def _cached_async(cache):
+    if cache.fresh():
+        future = Future()
+        future.set_result(cache.get())
+        return future
+    return submit_io(cache.get)
+
+def get_cached_transactions_async():
+    return _cached_async(transactions_cache)
+
+def get_cached_restock_data_async():
+    return _cached_async(restock_cache)
+
+def get_cached_reorder_points_async():
+    return _cached_async(reorder_cache)
+
+def gather(*futures):
+    """Waits for every future and returns their results in order."""
+    return [future.result() for future in futures]
+
+def fingerprint(value):
+    """Short content hash of a JSON-able value: equal values hash alike in every process."""
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+_restock_fingerprint = (None, None)
+
+def restock_fingerprint(restock_data):
+    """fingerprint() of the restock totals, memoized per cached object (it changes only on reload or write)."""
+    global _restock_fingerprint
+    value, digest = _restock_fingerprint
+    if value is not restock_data:
+        digest = fingerprint(restock_data)
+        _restock_fingerprint = (restock_data, digest)
+    return digest
+
+def data_version(df=None, restock_data=None, active=None):
+    """
+    Version of everything the read endpoints serve, derived from the content so every worker
+    computes the same one for the same data: the last synced TransactionID in `df`, a hash of
+    the restock totals and the pipeline flag. Pass the values the response is rendered from;
+    missing ones are read from the (cached) snapshots, refreshing both concurrently when stale.
+    """
+    if df is None or restock_data is None:
+        df, restock_data = gather(get_cached_transactions_async(), get_cached_restock_data_async())
+    if active is None:
+        active = get_cached_pipeline_status()
+    # Rows are appended in TransactionID order, so the last one is the watermark
+    watermark = int(df['TransactionID'].iat[-1]) if not df.empty and 'TransactionID' in df.columns else 0
+    return f"{watermark}.{restock_fingerprint(restock_data)}.{int(bool(active))}"
+
+def pipeline_version():
+    """Version of the pipeline status alone (the flag itself)."""
+    return f"p{int(bool(get_cached_pipeline_status()))}"
+
+def cache_stats():
+    """Hit/miss counters for the shared snapshots."""
+    return [transactions_cache.stats(), restock_cache.stats(), reorder_cache.stats(), get_pipeline_control().stats(),
+            transaction_sync.buffer.stats()]
+
+def _cache_metrics():
+    for cache in (transactions_cache, restock_cache, reorder_cache):
+        stats = cache.stats()
+        labels = {"cache": stats["name"]}
+        yield "cache_hits_total", "counter", labels, stats["hits"]
+        yield "cache_misses_total", "counter", labels, stats["misses"]
+        yield "cache_hit_ratio", "gauge", labels, stats["hit_rate"]
+    buffer = transaction_sync.buffer.stats()
+    yield "transaction_buffer_rows", "gauge", {}, buffer["rows"]
+    yield "transaction_buffer_bytes", "gauge", {}, buffer["allocated_bytes"]
+    yield "sync_watermark", "gauge", {}, transaction_sync.watermark
+
+metrics.register_collector(_cache_metrics)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        run_startup_migrations()
+    else:
+        print("Usage: python db_utils.py migrate")
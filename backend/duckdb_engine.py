@@ -0,0 +1,133 @@
+import os
+import threading
+
+import pandas as pd
+
+import aggregates
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Configuration
+DUCKDB_PATH = os.environ.get("DUCKDB_PATH", "analytics.duckdb")
+
+FACT_COLUMNS = ['TransactionID', 'Timestamp', 'ProductID', 'Quantity',
+                'TotalPrice', 'TotalCost', 'Region', 'Channel']
+
+
+def is_available():
+    return duckdb is not None
+
+
+class DuckDBEngine:
+    """
+    Analytics engine backed by a persistent DuckDB database.
+    New transactions are appended incrementally (by TransactionID watermark) to `sales_fact`,
+    and the dashboard aggregates are answered with SQL, so DuckDB's vectorized, multi-threaded
+    executor does the aggregation instead of per-request pandas groupbys.
+    Exposes the same add/add_frame/snapshot surface as AggregateStore.
+    """
+
+    def __init__(self, path=DUCKDB_PATH):
+        if duckdb is None:
+            raise ImportError("duckdb is required for ANALYTICS_ENGINE=duckdb (pip install duckdb)")
+        self._lock = threading.Lock()
+        try:
+            self._conn = duckdb.connect(path)
+        except duckdb.IOException as e:
+            # Another worker holds the file's lock: this one keeps its own copy in memory,
+            # caught up from the transactions snapshot like the pandas store
+            print(f"DuckDB file {path} is in use ({e}); using an in-memory database")
+            path = ":memory:"
+            self._conn = duckdb.connect(path)
+        self.path = path
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sales_fact (
+                TransactionID BIGINT PRIMARY KEY,
+                Timestamp TIMESTAMP,
+                ProductID VARCHAR,
+                Quantity INTEGER,
+                TotalPrice DOUBLE,
+                TotalCost DOUBLE,
+                Region VARCHAR,
+                Channel VARCHAR
+            )
+        """)
+        self.watermark = self._conn.execute(
+            "SELECT COALESCE(MAX(TransactionID), 0) FROM sales_fact").fetchone()[0]
+
+    def _cursor(self):
+        # DuckDB cursors are independent connections to the same database: safe per thread
+        return self._conn.cursor()
+
+    def add_frame(self, df):
+        """Appends the rows of `df` (sorted by TransactionID) newer than the watermark. Returns how many were inserted."""
+        if df.empty or 'TransactionID' not in df.columns:
+            return 0
+        with self._lock:
+            new_rows = aggregates.rows_after(df, self.watermark)
+            if new_rows.empty:
+                return 0
+            new_rows = new_rows[FACT_COLUMNS].copy()
+            if getattr(new_rows['Timestamp'].dt, 'tz', None) is not None:
+                new_rows['Timestamp'] = new_rows['Timestamp'].dt.tz_localize(None)
+            cursor = self._cursor()
+            cursor.register('new_rows', new_rows)
+            cursor.execute(f"INSERT OR IGNORE INTO sales_fact SELECT {', '.join(FACT_COLUMNS)} FROM new_rows")
+            cursor.unregister('new_rows')
+            self.watermark = int(new_rows['TransactionID'].iat[-1])
+            return len(new_rows)
+
+    def add(self, record):
+        """Appends a single transaction dict (as built by transaction.generate_single_transaction)."""
+        txn_id = record.get('TransactionID')
+        if txn_id is None or not aggregates.is_next(int(txn_id), self.watermark):
+            return False
+        row = {column: record.get(column) for column in FACT_COLUMNS}
+        if row['TotalCost'] is None:
+            row['TotalCost'] = float(row['TotalPrice'] or 0.0) * 0.7
+        row['Channel'] = row['Channel'] or 'Webstore'
+        df = pd.DataFrame([row])
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+        return self.add_frame(df) > 0
+
+    def snapshot(self):
+        """Dashboard aggregates in the same layout as AggregateStore.snapshot()."""
+        cursor = self._cursor()
+        total_revenue, total_cost, count, last_timestamp = cursor.execute("""
+            SELECT COALESCE(SUM(TotalPrice), 0), COALESCE(SUM(TotalCost), 0), COUNT(*), MAX(Timestamp)
+            FROM sales_fact
+        """).fetchone()
+        gross_profit = total_revenue - total_cost
+
+        trends = cursor.execute("""
+            SELECT CAST(CAST(Timestamp AS DATE) AS VARCHAR) AS Date,
+                   SUM(TotalPrice) AS Revenue,
+                   SUM(TotalPrice) - SUM(TotalCost) AS Profit
+            FROM sales_fact GROUP BY 1 ORDER BY 1
+        """).fetchall()
+        channels = cursor.execute(
+            "SELECT Channel, SUM(TotalPrice) FROM sales_fact GROUP BY 1 ORDER BY 1").fetchall()
+        regions = cursor.execute(
+            "SELECT Region, SUM(TotalPrice) FROM sales_fact GROUP BY 1 ORDER BY 1").fetchall()
+        products = cursor.execute("""
+            SELECT ProductID, SUM(TotalPrice) AS TotalSales, SUM(TotalPrice) - SUM(TotalCost) AS Totalprofit
+            FROM sales_fact GROUP BY 1 ORDER BY 1
+        """).fetchall()
+
+        return {
+            "total_revenue": float(total_revenue),
+            "gross_profit": float(gross_profit),
+            "profit_margin": (gross_profit / total_revenue * 100) if total_revenue > 0 else 0,
+            "count": int(count),
+            "last_timestamp": pd.Timestamp(last_timestamp) if last_timestamp is not None else None,
+            "trends": [{"Date": d, "Revenue": r, "Profit": p} for d, r, p in trends],
+            "channels": [{"Channel": c, "TotalPrice": v} for c, v in channels],
+            "regions": [{"Region": r, "TotalPrice": v} for r, v in regions],
+            "products": [
+                {"ProductID": pid, "TotalSales": sales, "Totalprofit": profit,
+                 "Margin": (profit / sales * 100) if sales else 0}
+                for pid, sales, profit in products
+            ],
+        }
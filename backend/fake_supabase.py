@@ -0,0 +1,178 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Primary key per table; rows are kept sorted by it so keyset pages are a binary search
+PRIMARY_KEYS = {
+    "sales_data": "TransactionID",
+    "restock_logs": "id",
+    "restock_totals": "product_id",
+    "pipeline_status": "id",
+    "reorder_points": "product_id",
+}
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeTable:
+    """One table held as a DataFrame sorted by its primary key."""
+
+    def __init__(self, name):
+        self.name = name
+        self.key = PRIMARY_KEYS.get(name, "id")
+        self.df = pd.DataFrame()
+        self.lock = threading.Lock()
+        self.on_write = None   # Stands in for an AFTER INSERT trigger
+
+    def write(self, rows, upsert):
+        incoming = pd.DataFrame(rows)
+        with self.lock:
+            if self.key not in incoming.columns:
+                start = int(self.df[self.key].max()) + 1 if not self.df.empty else 1
+                incoming[self.key] = np.arange(start, start + len(incoming))
+            if self.df.empty:
+                merged = incoming
+            else:
+                existing = self.df
+                if upsert:
+                    existing = existing[~existing[self.key].isin(incoming[self.key])]
+                merged = pd.concat([existing, incoming], ignore_index=True)
+            self.df = merged.sort_values(self.key, kind="stable").reset_index(drop=True)
+
+
+class FakeQuery:
+    """The subset of the postgrest query builder that db_utils uses."""
+
+    def __init__(self, table):
+        self.table = table
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._single = False
+        self._write = None
+
+    def select(self, *columns):
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(("eq", column, value))
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(("gt", column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def insert(self, rows):
+        self._write = (rows if isinstance(rows, list) else [rows], False)
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self._write = (rows if isinstance(rows, list) else [rows], True)
+        return self
+
+    def execute(self):
+        if self._write is not None:
+            rows, upsert = self._write
+            self.table.write(rows, upsert)
+            if self.table.on_write is not None:
+                self.table.on_write(rows)
+            return FakeResponse(rows)
+
+        df = self.table.df
+        key = self.table.key
+        if df.empty:
+            return FakeResponse(None if self._single else [])
+        for op, column, value in self._filters:
+            if column not in df.columns:
+                df = df.iloc[0:0]
+            elif column == key and op == "gt":
+                # Rows are sorted by key: keyset pagination is a binary search, not a scan
+                df = df.iloc[int(np.searchsorted(df[key].to_numpy(), value, side="right")):]
+            elif op == "gt":
+                df = df[df[column] > value]
+            else:
+                df = df[df[column] == value]
+        if self._order is not None:
+            column, desc = self._order
+            if column != key or desc:
+                df = df.sort_values(column, ascending=not desc)
+        if self._limit is not None:
+            df = df.iloc[:self._limit]
+
+        records = df.to_dict(orient="records")
+        if self._single:
+            return FakeResponse(records[0] if records else None)
+        return FakeResponse(records)
+
+
+class FakeSupabase:
+    """
+    In-process stand-in for the Supabase client: table().select().eq().gt().order().limit()
+    .single().insert().upsert().execute(). Used by the benchmark harness so the backend
+    endpoints can run without a live project. Counts calls per table.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.calls = {}
+
+    def _table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name)
+            if name == "restock_logs":
+                self.tables[name].on_write = self._apply_restock_totals
+        return self.tables[name]
+
+    def table(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return FakeQuery(self._table(name))
+
+    def _apply_restock_totals(self, rows):
+        """The restock_logs_totals trigger from setup.sql."""
+        totals = self._table("restock_totals")
+        current = dict(zip(totals.df["product_id"], totals.df["total_quantity"])) if not totals.df.empty else {}
+        for row in rows:
+            current[row["product_id"]] = int(current.get(row["product_id"], 0)) + int(row["quantity"])
+        totals.write([{"product_id": pid, "total_quantity": qty} for pid, qty in current.items()], upsert=True)
+
+    def seed_sales(self, n, seed=42):
+        """Seeds `n` transactions in the DB schema db_utils writes (see map_record_to_db_schema)."""
+        import transaction
+        start = pd.Timestamp.now() - pd.Timedelta(seconds=n)
+        batch = transaction.generate_transaction_batch(n, 1, start, 1.0, np.random.default_rng(seed))
+        df = pd.DataFrame({
+            "TransactionID": batch["TransactionID"],
+            "Timestamp": np.char.replace(np.datetime_as_string(batch["Timestamp"], unit="s"), "T", " "),
+            "ProductID": batch["ProductID"],
+            "Quantity": batch["Quantity"],
+            "price_per_unit": batch["PricePerUnit"],
+            "total_price": batch["TotalPrice"],
+            "region": batch["Region"],
+        })
+        self._table("sales_data").df = df
+
+    def seed_defaults(self):
+        """Pipeline status row and a few restocks, as setup.sql would leave them."""
+        import transaction
+        self.table("pipeline_status").upsert({"id": 1, "active": True, "updated_at": pd.Timestamp.now().isoformat()}).execute()
+        self.table("restock_logs").insert([
+            {"product_id": pid, "quantity": 100, "timestamp": pd.Timestamp.now().isoformat()}
+            for pid in transaction.WEARS[:5]
+        ]).execute()
+        self.calls.clear()
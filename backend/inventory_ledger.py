@@ -0,0 +1,183 @@
+import collections
+import itertools
+import json
+import os
+import threading
+import time
+
+import aggregates
+
+# Configuration
+INITIAL_STOCK = int(os.environ.get("INITIAL_STOCK", "200"))
+LOW_STOCK_THRESHOLD = int(os.environ.get("LOW_STOCK_THRESHOLD", "50"))
+# Per-product reorder points as JSON, e.g. {"Leather Biker Jacket": 20}
+REORDER_POINTS = os.environ.get("REORDER_POINTS", "")
+STOCK_EVENT_HISTORY = int(os.environ.get("STOCK_EVENT_HISTORY", "500"))
+
+IN_STOCK = "In Stock"
+LOW_STOCK = "Low Stock"
+OUT_OF_STOCK = "Out of Stock"
+STATUS_COLORS = {IN_STOCK: "text-green-400", LOW_STOCK: "text-yellow-400", OUT_OF_STOCK: "text-red-500"}
+
+
+def _load_reorder_points():
+    if not REORDER_POINTS:
+        return {}
+    try:
+        return {pid: int(level) for pid, level in json.loads(REORDER_POINTS).items()}
+    except (ValueError, AttributeError) as e:
+        print(f"Error parsing REORDER_POINTS: {e}")
+        return {}
+
+
+class InventoryLedger:
+    """
+    Stock per product, updated per sale and per restock instead of being rebuilt from
+    the whole table on every request. Each product has a reorder point (LOW_STOCK_THRESHOLD
+    unless overridden); when a product's status changes (In Stock -> Low Stock -> Out of Stock
+    and back on restock) a stock event goes to every subscriber.
+    Sales are applied once each, tracked by TransactionID like the AggregateStore.
+    """
+
+    def __init__(self, products, initial_stock=INITIAL_STOCK, reorder_points=None):
+        self._lock = threading.Lock()
+        self.initial_stock = initial_stock
+        # REORDER_POINTS are the defaults; points stored through the API are layered on top
+        self.default_reorder_points = dict(_load_reorder_points() if reorder_points is None else reorder_points)
+        self.reorder_points = dict(self.default_reorder_points)
+        self.watermark = 0  # Highest TransactionID applied so far
+        self.sold = {pid: 0 for pid in products}
+        self.restocked = {pid: 0 for pid in products}
+        self.status = {pid: IN_STOCK for pid in products}
+        self.events = collections.deque(maxlen=STOCK_EVENT_HISTORY)
+        self._sequence = itertools.count(1)
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Registers a callable that receives each stock event dict."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def _emit(self, events):
+        for event in events:
+            for callback in list(self._subscribers):
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Error in stock event subscriber: {e}")
+
+    def reorder_point(self, product_id):
+        return self.reorder_points.get(product_id, LOW_STOCK_THRESHOLD)
+
+    def _remaining(self, product_id):
+        return self.initial_stock + self.restocked.get(product_id, 0) - self.sold.get(product_id, 0)
+
+    def _classify(self, product_id):
+        remaining = self._remaining(product_id)
+        if remaining <= 0:
+            return OUT_OF_STOCK
+        if remaining < self.reorder_point(product_id):
+            return LOW_STOCK
+        return IN_STOCK
+
+    def _reevaluate(self, product_ids):
+        """Updates the status of the given products; returns the transition events (call under the lock)."""
+        events = []
+        for pid in product_ids:
+            previous = self.status.get(pid)
+            if previous is None:
+                continue  # Not a tracked product
+            status = self._classify(pid)
+            if status == previous:
+                continue
+            self.status[pid] = status
+            event = {
+                "seq": next(self._sequence),
+                "product_id": pid,
+                "from": previous,
+                "to": status,
+                "remaining": max(self._remaining(pid), 0),
+                "reorder_point": self.reorder_point(pid),
+                "timestamp": time.time(),
+            }
+            self.events.append(event)
+            events.append(event)
+        return events
+
+    def add(self, record):
+        """Applies one sale (a transaction dict). Returns True if it was new."""
+        txn_id = record.get('TransactionID')
+        pid = record.get('ProductID') or record.get('product_id')
+        if txn_id is None or pid is None:
+            return False
+        with self._lock:
+            if not aggregates.is_next(int(txn_id), self.watermark):
+                return False
+            self.watermark = int(txn_id)
+            self.sold[pid] = self.sold.get(pid, 0) + int(record.get('Quantity') or 0)
+            events = self._reevaluate([pid])
+        self._emit(events)
+        return True
+
+    def add_frame(self, df):
+        """Applies the sales in `df` (sorted by TransactionID) newer than the watermark, one groupby per batch. Returns how many."""
+        if df.empty or 'TransactionID' not in df.columns:
+            return 0
+        with self._lock:
+            new_rows = aggregates.rows_after(df, self.watermark)
+            if new_rows.empty:
+                return 0
+            sold = new_rows.groupby('ProductID', observed=True)['Quantity'].sum()
+            for pid, quantity in sold.items():
+                self.sold[pid] = self.sold.get(pid, 0) + int(quantity)
+            self.watermark = int(new_rows['TransactionID'].iat[-1])
+            events = self._reevaluate(sold.index)
+        self._emit(events)
+        return len(new_rows)
+
+    def sync_restocks(self, totals):
+        """Applies the per-product restock totals (db_utils' write-through cache), re-checking only changed products."""
+        with self._lock:
+            changed = [pid for pid, quantity in totals.items() if self.restocked.get(pid, 0) != quantity]
+            for pid in changed:
+                self.restocked[pid] = int(totals[pid])
+            events = self._reevaluate(changed)
+        self._emit(events)
+
+    def sync_reorder_points(self, stored):
+        """Applies the stored reorder points (db_utils' write-through cache) over the defaults, re-checking changed products."""
+        points = dict(self.default_reorder_points)
+        points.update((pid, int(level)) for pid, level in stored.items())
+        with self._lock:
+            changed = [pid for pid in set(points) | set(self.reorder_points)
+                       if points.get(pid) != self.reorder_points.get(pid)]
+            if not changed:
+                return
+            self.reorder_points = points
+            events = self._reevaluate(changed)
+        self._emit(events)
+
+    def recent_events(self, since=0):
+        """Stock events with a sequence number above `since`, oldest first."""
+        with self._lock:
+            return [event for event in self.events if event["seq"] > since]
+
+    def rows(self):
+        """The /api/inventory rows, most critical first."""
+        with self._lock:
+            rows = []
+            for pid, status in self.status.items():
+                sold = self.sold.get(pid, 0)
+                rows.append({
+                    "id": pid,             # Name is the ID now
+                    "name": pid,
+                    "initial_stock": self.initial_stock + self.restocked.get(pid, 0),
+                    "sold": int(sold),
+                    "remaining": int(max(self._remaining(pid), 0)),  # Sustain non-negative
+                    "reorder_point": self.reorder_point(pid),
+                    "status": status,
+                    "status_color": STATUS_COLORS[status],
+                })
+        # Sort by remaining stock (Ascending: 0 -> Max) to show critical items first
+        rows.sort(key=lambda x: x['remaining'])
+        return rows
@@ -0,0 +1,182 @@
+import os
+import threading
+
+import serialization
+
+# Configuration
+STREAM_REFRESH_INTERVAL = float(os.environ.get("STREAM_REFRESH_INTERVAL", "1.0"))  # seconds
+STREAM_KEEPALIVE = float(os.environ.get("STREAM_KEEPALIVE", "15.0"))               # seconds
+
+# List sections whose rows are diffed by a key field (anything else is merged or replaced whole)
+KEYED_SECTIONS = {
+    "dashboard.trends": "Date",
+    "dashboard.channels": "Channel",
+    "dashboard.regions": "Region",
+    "dashboard.products": "ProductID",
+    "inventory": "id",
+}
+
+
+def _flatten(state):
+    """{'dashboard': {'kpi': ..., 'trends': ...}, 'inventory': [...]} -> {'dashboard.kpi': ..., 'inventory': [...]}"""
+    flat = {}
+    for name, value in state.items():
+        if name == "dashboard" and isinstance(value, dict):
+            for part, part_value in value.items():
+                flat[f"dashboard.{part}"] = part_value
+        else:
+            flat[name] = value
+    return flat
+
+
+def diff_states(old, new):
+    """
+    Returns the list of changes turning `old` into `new`:
+      {"path": p, "merge": {...}}                      changed keys of a dict section (e.g. the KPIs)
+      {"path": p, "key": k, "upsert": [...], "remove": [...]}   changed rows of a keyed list
+      {"path": p, "replace": value}                    anything else that changed
+    """
+    old_flat, new_flat = _flatten(old or {}), _flatten(new)
+    changes = []
+    for path, value in new_flat.items():
+        previous = old_flat.get(path)
+        if previous == value:
+            continue
+        key = KEYED_SECTIONS.get(path)
+        if key and isinstance(previous, list) and isinstance(value, list):
+            previous_rows = {row[key]: row for row in previous}
+            current_keys = set()
+            upsert = []
+            for row in value:
+                current_keys.add(row[key])
+                if previous_rows.get(row[key]) != row:
+                    upsert.append(row)
+            remove = [k for k in previous_rows if k not in current_keys]
+            changes.append({"path": path, "key": key, "upsert": upsert, "remove": remove})
+        elif isinstance(previous, dict) and isinstance(value, dict):
+            changes.append({"path": path, "merge": {k: v for k, v in value.items() if previous.get(k) != v}})
+        else:
+            changes.append({"path": path, "replace": value})
+    return changes
+
+
+def format_event(event, data, version=None):
+    """Encodes one Server-Sent Event."""
+    lines = []
+    if version is not None:
+        lines.append(f"id: {version}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {serialization.dumps(data).decode()}")
+    return "\n".join(lines) + "\n\n"
+
+
+def consistent_state(compute_state, change_token, token, attempts=3):
+    """
+    Computes the state and returns it with the token it was built from. If the inputs moved
+    while computing, it retries, so a token is never paired with a state built from other data.
+    After the last attempt it pairs the state with the earlier token, so the state can only be
+    newer than the token and the next check rebuilds it.
+    """
+    for _ in range(attempts):
+        before = token
+        state = compute_state()
+        token = change_token()
+        if token == before:
+            return state, token
+    return state, before
+
+
+class Broadcaster:
+    """
+    Pushes live dashboard state to streaming clients.
+    One refresher thread per process runs only while clients are connected. Each tick it asks
+    `change_token()` (cheap: the delta-sync watermark, restock and status generations) whether
+    anything moved, and only then rebuilds the state with `compute_state()`. Each client is sent
+    a full snapshot on connect and afterwards only the diff against what it last received.
+    """
+
+    def __init__(self, compute_state, change_token, interval=STREAM_REFRESH_INTERVAL):
+        self.compute_state = compute_state
+        self.change_token = change_token
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._token = None
+        self.state = None
+        self.version = 0
+        self.subscribers = 0
+
+    def poke(self, *args):
+        """Asks the refresher to check for changes now (e.g. from an in-process transaction listener)."""
+        self._wakeup.set()
+
+    def refresh(self):
+        """Rebuilds and publishes the state if the change token moved. Returns True when published."""
+        token = self.change_token()
+        if token == self._token and self.state is not None:
+            return False
+        state, token = consistent_state(self.compute_state, self.change_token, token)
+        with self._cond:
+            self._token = token
+            if state == self.state:
+                return False
+            self.state = state
+            self.version += 1
+            self._cond.notify_all()
+        return True
+
+    def latest(self):
+        """(change token, state) brought up to date; the state is only rebuilt when the token moved."""
+        self.refresh()
+        with self._cond:
+            return self._token, self.state
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self.subscribers == 0:
+                    self._thread = None
+                    return
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing live state: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def _ensure_refresher(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-refresher", daemon=True)
+                self._thread.start()
+
+    def current(self):
+        """(version, state), computing the state if nobody has yet."""
+        if self.state is None:
+            self.refresh()
+        with self._cond:
+            return self.version, self.state
+
+    def stream(self):
+        """Generator of SSE-encoded events for one client: a snapshot, then deltas as data changes."""
+        with self._cond:
+            self.subscribers += 1
+        self._ensure_refresher()
+        try:
+            version, sent_state = self.current()
+            yield format_event("snapshot", sent_state, version)
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self.version != version, timeout=STREAM_KEEPALIVE)
+                    new_version, state = self.version, self.state
+                if new_version == version:
+                    yield ": keep-alive\n\n"
+                    continue
+                changes = diff_states(sent_state, state)
+                version, sent_state = new_version, state
+                if changes:
+                    yield format_event("delta", {"version": version, "changes": changes}, version)
+        finally:
+            with self._cond:
+                self.subscribers -= 1
@@ -0,0 +1,263 @@
+import bisect
+import collections
+import contextlib
+import contextvars
+import functools
+import http.server
+import os
+import sys
+import threading
+import time
+
+# Configuration
+PROFILE_SLOW_REQUEST_MS = float(os.environ.get("PROFILE_SLOW_REQUEST_MS", "0"))    # 0 disables the sampling profiler
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILE_KEEP = 20  # Slow-request profiles kept for /api/debug/profiles
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "stage_seconds": "Time spent in each named stage of the hot path.",
+    "http_request_seconds": "Request latency per endpoint.",
+    "upstream_calls_total": "Calls to the storage backend by table and operation.",
+    "upstream_call_seconds": "Latency of storage backend calls.",
+    "upstream_errors_total": "Storage backend calls that raised.",
+    "rows_fetched_total": "Transaction rows downloaded from the storage backend.",
+    "transactions_generated_total": "Transactions produced by the generator.",
+    "listener_errors_total": "Transaction listeners that raised.",
+}
+
+# Stages recorded during the current request (a list, or None outside a request)
+_request_stages = contextvars.ContextVar("request_stages", default=None)
+
+
+class Registry:
+    """Process-local counters and histograms keyed by (name, labels), plus callbacks for derived values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}  # key -> [bucket counts..., +Inf count], sum
+        self.collectors = []
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(LATENCY_BUCKETS, value)
+        with self._lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def register_collector(self, collect):
+        """`collect()` returns (name, type, labels dict, value) tuples, evaluated at scrape time."""
+        self.collectors.append(collect)
+
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(entry[0]), entry[1])) for key, entry in self.histograms.items())
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), (counts, total) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        # Collected samples are grouped per metric: the format wants each family's samples together
+        families = collections.OrderedDict()
+        for collect in self.collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+                continue
+            for name, kind, labels, value in samples:
+                if value is not None:
+                    families.setdefault((name, kind), []).append((labels, value))
+        for (name, kind), samples in families.items():
+            header(name, kind)
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+register_collector = registry.register_collector
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Times a block into stage_seconds{stage=name} and, inside a request, its Server-Timing header."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe("stage_seconds", elapsed, stage=name)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((name, elapsed))
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_request():
+    """Starts collecting stages for the current request (thread or copied context)."""
+    _request_stages.set([])
+
+
+def server_timing(total=None):
+    """The Server-Timing header value for the current request: summed time per stage, then the total."""
+    totals = collections.OrderedDict()
+    for name, elapsed in _request_stages.get() or ():
+        totals[name] = totals.get(name, 0.0) + elapsed
+    entries = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in totals.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def serve(port):
+    """Serves GET /metrics on `port` from a daemon thread (for processes without the Flask app, e.g. the generator)."""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+class SamplingProfiler:
+    """
+    Opt-in profiler for slow requests: while enabled, a background thread samples the stacks of
+    threads serving requests every PROFILE_SAMPLE_INTERVAL. When a request takes longer than
+    PROFILE_SLOW_REQUEST_MS its most frequent stacks are printed and kept for inspection.
+    """
+
+    def __init__(self, threshold_ms=PROFILE_SLOW_REQUEST_MS, interval=PROFILE_SAMPLE_INTERVAL):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.enabled = threshold_ms > 0
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> Counter of collapsed stacks
+        self._thread = None
+        self._pid = None
+        self.recent = collections.deque(maxlen=PROFILE_KEEP)
+
+    def _ensure_sampler(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, samples in active.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[_collapse(frame)] += 1
+
+    def start(self):
+        """Starts sampling the calling thread; returns a token for finish(), or None when disabled."""
+        if not self.enabled:
+            return None
+        self._ensure_sampler()
+        samples = collections.Counter()
+        with self._lock:
+            self._active[threading.get_ident()] = samples
+        return samples
+
+    def finish(self, token, label, elapsed):
+        if token is None:
+            return
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+        if elapsed < self.threshold:
+            return
+        top = token.most_common(5)
+        self.recent.append({
+            "request": label,
+            "ms": round(elapsed * 1000, 1),
+            "samples": sum(token.values()),
+            "stacks": [{"stack": stack, "samples": count} for stack, count in top],
+        })
+        print(f"Slow request {label}: {elapsed * 1000:.0f} ms, {sum(token.values())} samples")
+        for stack, count in top:
+            print(f"  {count:4d}  {stack}")
+
+
+def _collapse(frame, limit=30):
+    """A stack as 'file:function:line;...' from the outermost frame in, trimmed to the innermost `limit`."""
+    parts = []
+    while frame is not None and len(parts) < limit:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+profiler = SamplingProfiler()
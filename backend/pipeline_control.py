@@ -0,0 +1,225 @@
+import json
+import os
+import select
+import socket
+import threading
+import time
+from datetime import datetime
+
+# Configuration
+PIPELINE_STATUS_PATH = os.environ.get("PIPELINE_STATUS_PATH", "pipeline_status.json")
+PIPELINE_CONTROL_PORT = int(os.environ.get("PIPELINE_CONTROL_PORT", "50555"))  # localhost UDP, 0 disables
+PIPELINE_DB_SYNC_INTERVAL = float(os.environ.get("PIPELINE_DB_SYNC_INTERVAL", "5.0"))  # seconds between background stored-status checks, 0 = startup only
+FILE_WATCH_INTERVAL = 0.1  # seconds between state-file checks when there is no socket
+
+
+class PipelineControl:
+    """
+    The pipeline on/off switch shared by the API and the generator.
+    The state lives in memory and in a small JSON file (active, generation, updated_at);
+    every change bumps `generation`. Readers only stat the file to pick up changes made by
+    other processes (e.g. other gunicorn workers), so a status read never touches the database.
+    A change also sends the new generation as a UDP datagram to localhost, which wakes a
+    generator blocked in wait() immediately instead of on its next poll.
+    The stored status (`loader`, which should raise on errors) is the source of record: it is
+    read at startup and then every `sync_interval` seconds by a background thread, and wins over
+    the file, so hosts that ship their own file (or cannot write one, e.g. serverless) still
+    agree with each other. Reads on the request path never wait for it.
+    """
+
+    def __init__(self, path=PIPELINE_STATUS_PATH, port=PIPELINE_CONTROL_PORT, loader=None,
+                 sync_interval=PIPELINE_DB_SYNC_INTERVAL):
+        self.path = path
+        self.port = port
+        self.loader = loader
+        self.sync_interval = sync_interval
+        self.writable = True  # False once writing the state file failed (read-only host)
+        self._sync_pid = None
+        self._sync_start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.active = True
+        self.generation = 0
+        self.updated_at = None
+        self._file_id = None
+        self._sock = None
+        self.notifications_sent = 0
+        self.notifications_received = 0
+        self._refresh()
+        self._sync()
+
+    def _refresh(self):
+        """Re-reads the state file if it changed since the last look (one stat otherwise)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        # The inode changes on every atomic replace, so same-tick writes are not missed
+        file_id = (st.st_mtime_ns, st.st_ino, st.st_size)
+        if file_id == self._file_id:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading pipeline status: {e}")
+            return
+        with self._lock:
+            self._file_id = file_id
+            self.active = bool(data.get('active', True))
+            self.generation = max(self.generation, int(data.get('generation', 0)))
+            self.updated_at = data.get('updated_at')
+
+    def _sync(self):
+        """Adopts the stored status if it differs."""
+        if self.loader is None:
+            return
+        generation = self.generation
+        try:
+            active = bool(self.loader())
+        except Exception as e:
+            print(f"Error loading stored pipeline status: {e}")
+            return
+        with self._lock:
+            # A local change during the read is newer than what we read
+            if self.generation != generation or active == self.active:
+                return
+            generation = self._apply(active)
+        self._notify(generation)
+
+    def _ensure_syncing(self):
+        """Starts the background storage sync in this process (idempotent; safe across fork)."""
+        if self.loader is None or not self.sync_interval or self._sync_pid == os.getpid():
+            return
+        with self._sync_start_lock:
+            if self._sync_pid == os.getpid():
+                return
+            self._sync_pid = os.getpid()
+            threading.Thread(target=self._sync_loop, name="pipeline-sync", daemon=True).start()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            self._sync()
+
+    def is_active(self):
+        """The current status from memory and the state file (never a storage read)."""
+        self._ensure_syncing()
+        self._refresh()
+        return self.active
+
+    def state(self):
+        self._ensure_syncing()
+        self._refresh()
+        with self._lock:
+            return {"active": self.active, "generation": self.generation, "updated_at": self.updated_at}
+
+    def set_active(self, active):
+        """
+        Changes the status (already stored by the caller), writes the state file and notifies the
+        generator. Both are best-effort: on a read-only host the status lives in memory and other
+        processes pick it up from storage on their next sync.
+        """
+        self._refresh()
+        with self._lock:
+            generation = self._apply(active)
+        self._notify(generation)
+        return generation
+
+    def _apply(self, active):
+        """Sets the status and bumps the generation (caller holds the lock). Returns the generation."""
+        self.active = bool(active)
+        self.generation += 1
+        self.updated_at = datetime.now().isoformat()
+        self._write({"active": self.active, "generation": self.generation, "updated_at": self.updated_at})
+        return self.generation
+
+    def _write(self, data):
+        if not self.writable:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                # A bind-mounted file (docker-compose) cannot be replaced: rewrite it in place
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with open(self.path, 'w') as f:
+                    json.dump(data, f)
+        except OSError as e:
+            print(f"Cannot write {self.path} ({e}); using the stored pipeline status only")
+            self.writable = False
+            return
+        try:
+            st = os.stat(self.path)
+            self._file_id = (st.st_mtime_ns, st.st_ino, st.st_size)
+        except OSError:
+            pass
+
+    def _notify(self, generation):
+        if not self.port:
+            return
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(str(generation).encode(), ("127.0.0.1", self.port))
+            self.notifications_sent += 1
+        except OSError as e:
+            print(f"Error notifying pipeline: {e}")
+
+    def listen(self):
+        """Binds the notification socket (the generator's side). Returns False if it is unavailable."""
+        if not self.port or self._sock is not None:
+            return self._sock is not None
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(("127.0.0.1", self.port))
+            sock.setblocking(False)
+            self._sock = sock
+            return True
+        except OSError as e:
+            print(f"Pipeline control socket unavailable ({e}); falling back to watching {self.path}")
+            return False
+
+    def wait(self, timeout):
+        """
+        Blocks until a notification arrives or `timeout` seconds pass, then refreshes the state.
+        Returns True if the generation changed. Without a socket the state file is stat'ed
+        every FILE_WATCH_INTERVAL seconds instead.
+        """
+        generation = self.generation
+        if self._sock is None:
+            deadline = time.monotonic() + timeout
+            while True:
+                self._refresh()
+                remaining = deadline - time.monotonic()
+                if self.generation != generation or remaining <= 0:
+                    break
+                time.sleep(min(remaining, FILE_WATCH_INTERVAL))
+        else:
+            readable, _, _ = select.select([self._sock], [], [], timeout)
+            if readable:
+                try:
+                    while True:
+                        self._sock.recv(64)
+                        self.notifications_received += 1
+                except (BlockingIOError, OSError):
+                    pass
+        self._refresh()
+        return self.generation != generation
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def stats(self):
+        state = self.state()
+        state.update({
+            "name": "pipeline_control",
+            "notifications_sent": self.notifications_sent,
+            "notifications_received": self.notifications_received,
+            "file_writable": self.writable,
+        })
+        return state
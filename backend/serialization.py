@@ -0,0 +1,140 @@
+import datetime
+import gzip
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Configuration
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))  # Smaller bodies are sent as-is
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))  # 5 is about gzip -9 size at gzip -6 speed
+
+
+def _default(value):
+    """NumPy scalars/arrays and timestamps that the encoders do not know natively."""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(obj):
+    """Compact JSON as bytes: orjson when installed (several times faster), else the stdlib encoder."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def to_columnar(obj):
+    """
+    Rewrites every list of row dicts in `obj` as {column: [values]}, so each key is written once
+    instead of once per row. Lists that are not uniform rows (scalars, mixed keys) are kept.
+    """
+    if isinstance(obj, dict):
+        return {key: to_columnar(value) for key, value in obj.items()}
+    if isinstance(obj, pd.DataFrame):
+        return {column: obj[column].to_numpy() for column in obj.columns}
+    if isinstance(obj, list) and obj and all(isinstance(row, dict) for row in obj):
+        keys = list(obj[0])
+        if all(len(row) == len(keys) and all(key in row for key in keys) for row in obj):
+            return {key: to_columnar([row[key] for row in obj]) if isinstance(obj[0][key], (dict, list))
+                    else [row[key] for row in obj] for key in keys}
+        return [to_columnar(row) for row in obj]
+    if isinstance(obj, list):
+        return [to_columnar(value) if isinstance(value, (dict, list)) else value for value in obj]
+    return obj
+
+
+def negotiate(accept_encodings):
+    """Best encoding in a parsed Accept-Encoding (werkzeug Accept): br when available, then gzip, else None."""
+    if brotli is not None and accept_encodings["br"] > 0:
+        return "br"
+    if accept_encodings["gzip"] > 0:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    """Returns `body` compressed with `encoding` (or unchanged for None / small bodies) and the encoding used."""
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+
+
+class ResponseStats:
+    """Per-endpoint serialize time and bytes before/after compression."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def _entry(self, endpoint):
+        entry = self.endpoints.get(endpoint)
+        if entry is None:
+            entry = self.endpoints[endpoint] = {
+                "serializations": 0, "serialize_seconds": 0.0,
+                "responses": 0, "json_bytes": 0, "wire_bytes": 0, "compress_seconds": 0.0,
+            }
+        return entry
+
+    def record_serialize(self, endpoint, seconds):
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["serializations"] += 1
+            entry["serialize_seconds"] += seconds
+
+    def record_response(self, endpoint, json_bytes, wire_bytes, compress_seconds=0.0):
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["responses"] += 1
+            entry["json_bytes"] += json_bytes
+            entry["wire_bytes"] += wire_bytes
+            entry["compress_seconds"] += compress_seconds
+
+    def stats(self):
+        with self._lock:
+            endpoints = {}
+            for endpoint, entry in sorted(self.endpoints.items()):
+                endpoints[endpoint] = dict(
+                    entry,
+                    avg_serialize_ms=(entry["serialize_seconds"] * 1000 / entry["serializations"]) if entry["serializations"] else None,
+                    avg_wire_bytes=(entry["wire_bytes"] / entry["responses"]) if entry["responses"] else None,
+                    compression_ratio=(entry["json_bytes"] / entry["wire_bytes"]) if entry["wire_bytes"] else None,
+                )
+            return {
+                "name": "responses",
+                "encoder": "orjson" if orjson is not None else "json",
+                "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+                "endpoints": endpoints,
+            }
+
+
+response_stats = ResponseStats()
+
+
+def encode(obj, endpoint, columnar=False):
+    """Serializes a response payload (optionally columnar), recording the time and size under `endpoint`."""
+    started = time.perf_counter()
+    body = dumps(to_columnar(obj) if columnar else obj)
+    response_stats.record_serialize(endpoint, time.perf_counter() - started)
+    return body
@@ -6,6 +6,37 @@ create table if not exists restock_logs (
   timestamp timestamp with time zone default timezone('utc'::text, now()) not null
 );
 
+-- Maintained per-product restock totals (the inventory endpoint reads these <= 20 rows
+-- instead of scanning the whole restock_logs history; restock_logs stays the audit trail)
+create table if not exists restock_totals (
+  product_id text primary key,
+  total_quantity bigint not null default 0,
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+create index if not exists restock_logs_product_id_idx on restock_logs (product_id);
+
+create or replace function apply_restock_to_totals() returns trigger as $$
+begin
+  insert into restock_totals (product_id, total_quantity, updated_at)
+  values (new.product_id, new.quantity, timezone('utc'::text, now()))
+  on conflict (product_id) do update
+    set total_quantity = restock_totals.total_quantity + excluded.total_quantity,
+        updated_at = excluded.updated_at;
+  return new;
+end;
+$$ language plpgsql security definer;
+
+drop trigger if exists restock_logs_totals on restock_logs;
+create trigger restock_logs_totals
+  after insert on restock_logs
+  for each row execute function apply_restock_to_totals();
+
+-- Backfill totals from any existing history
+insert into restock_totals (product_id, total_quantity)
+select product_id, sum(quantity) from restock_logs group by product_id
+on conflict (product_id) do update set total_quantity = excluded.total_quantity;
+
 -- Create pipeline_status table for controlling the data pipeline
 create table if not exists pipeline_status (
   id bigint generated by default as identity primary key,
@@ -18,14 +49,29 @@ insert into pipeline_status (id, active)
 select 1, true
 where not exists (select 1 from pipeline_status where id = 1);
 
+-- Per-product reorder points set through the API (products without a row use the default)
+create table if not exists reorder_points (
+  product_id text primary key,
+  level integer not null check (level >= 0),
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
 -- Optional: Enable RLS (Row Level Security) if needed, but for now we assume anon/service runs this
 alter table restock_logs enable row level security;
 alter table pipeline_status enable row level security;
+alter table restock_totals enable row level security;
+alter table reorder_points enable row level security;
 
 -- Policies (Open for Demo Purposes - allow anon access)
 create policy "Enable read access for all users" on restock_logs for select using (true);
 create policy "Enable insert access for all users" on restock_logs for insert with check (true);
 
+create policy "Enable read access for all users" on restock_totals for select using (true);
+
 create policy "Enable read access for all users" on pipeline_status for select using (true);
 create policy "Enable update access for all users" on pipeline_status for update using (true);
 create policy "Enable insert access for all users" on pipeline_status for insert with check (true);
+
+create policy "Enable read access for all users" on reorder_points for select using (true);
+create policy "Enable update access for all users" on reorder_points for update using (true);
+create policy "Enable insert access for all users" on reorder_points for insert with check (true);
@@ -0,0 +1,194 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import live_updates
+import serialization
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process leader election, every worker computes for itself
+    fcntl = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configuration
+SHARED_SNAPSHOT_PATH = os.environ.get("SHARED_SNAPSHOT_PATH", "")  # e.g. /dev/shm/sales_dashboard.snapshot; empty disables
+SHARED_SNAPSHOT_BYTES = int(os.environ.get("SHARED_SNAPSHOT_BYTES", str(16 * 1024 * 1024)))
+SHARED_SNAPSHOT_INTERVAL = float(os.environ.get("SHARED_SNAPSHOT_INTERVAL", "1.0"))  # seconds between publisher checks
+SHARED_SNAPSHOT_MAX_AGE = float(os.environ.get("SHARED_SNAPSHOT_MAX_AGE", "10.0"))   # heartbeat age before readers give up
+
+# Header: magic, generation (publishes so far), heartbeat (publisher's last check, epoch seconds)
+HEADER = struct.Struct("<8sQd")
+HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct("<QQ")  # seq (odd while being written), payload length
+MAGIC = b"SNAPSHT1"
+
+
+class SharedSnapshot:
+    """
+    A versioned snapshot in a memory-mapped file shared by every worker on the host.
+    There are two slots: the writer fills the one readers are not being pointed at, then bumps
+    the generation to flip them. Each slot carries a sequence number that is odd while it is
+    being written (a seqlock), so readers never take a lock: they read the slot, check the
+    sequence did not move, and retry otherwise. Decoded snapshots are cached per generation,
+    so a reader parses each publish once. Only one process may write (see SnapshotPublisher).
+    """
+
+    def __init__(self, path=SHARED_SNAPSHOT_PATH, size=SHARED_SNAPSHOT_BYTES):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            size = os.fstat(fd).st_size
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.slot_size = (size - HEADER_SIZE) // 2
+        self._cached_generation = None
+        self._cached = None
+        self.retries = 0
+
+    def _slot_offset(self, generation):
+        return HEADER_SIZE + (generation % 2) * self.slot_size
+
+    def _header(self):
+        magic, generation, heartbeat = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            return 0, 0.0
+        return generation, heartbeat
+
+    def publish(self, payload):
+        """Writes `payload` (bytes) into the idle slot and flips readers to it. Returns the new generation."""
+        if len(payload) > self.slot_size - SLOT_HEADER.size:
+            raise ValueError(f"Snapshot of {len(payload)} bytes exceeds the {self.slot_size}-byte slot")
+        generation, _ = self._header()
+        offset = self._slot_offset(generation + 1)
+        seq, _ = SLOT_HEADER.unpack_from(self._mm, offset)
+        seq += seq % 2  # Recover from a writer that died mid-publish
+        SLOT_HEADER.pack_into(self._mm, offset, seq + 1, 0)
+        self._mm[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(payload)] = payload
+        SLOT_HEADER.pack_into(self._mm, offset, seq + 2, len(payload))
+        HEADER.pack_into(self._mm, 0, MAGIC, generation + 1, time.time())
+        return generation + 1
+
+    def heartbeat(self):
+        generation, _ = self._header()
+        HEADER.pack_into(self._mm, 0, MAGIC, generation, time.time())
+
+    def read(self, max_age=SHARED_SNAPSHOT_MAX_AGE):
+        """The latest published object, or None if nothing (recent) has been published."""
+        for _ in range(100):
+            generation, heartbeat = self._header()
+            if generation == 0 or time.time() - heartbeat > max_age:
+                return None
+            if generation == self._cached_generation:
+                return self._cached
+            offset = self._slot_offset(generation)
+            seq, length = SLOT_HEADER.unpack_from(self._mm, offset)
+            if seq % 2 == 0:
+                view = memoryview(self._mm)[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length]
+                try:
+                    # Parsed straight out of the mapping; orjson reads the memoryview without a copy
+                    value = orjson.loads(view) if orjson is not None else json.loads(bytes(view))
+                except ValueError:
+                    value = None  # Torn read: the sequence check below rejects it
+                finally:
+                    view.release()
+                if SLOT_HEADER.unpack_from(self._mm, offset)[0] == seq and value is not None:
+                    self._cached_generation, self._cached = generation, value
+                    return value
+            self.retries += 1
+            time.sleep(0)
+        return None
+
+    def stats(self):
+        generation, heartbeat = self._header()
+        return {
+            "name": "shared_snapshot",
+            "path": self.path,
+            "generation": generation,
+            "heartbeat_age_seconds": (time.time() - heartbeat) if generation else None,
+            "slot_bytes": self.slot_size,
+            "read_retries": self.retries,
+        }
+
+
+class SnapshotPublisher:
+    """
+    Elects one aggregator per host with an exclusive flock on `<path>.lock`; the winner computes
+    the state and publishes it whenever `change_token()` moves (checked every `interval`, or
+    sooner after poke()). The other workers keep trying the lock, so if the aggregator dies
+    (and the kernel drops its lock) another one takes over.
+    """
+
+    def __init__(self, shared, compute_state, change_token, interval=SHARED_SNAPSHOT_INTERVAL):
+        self.shared = shared
+        self.compute_state = compute_state
+        self.change_token = change_token
+        self.interval = interval
+        self.is_leader = False
+        self.publishes = 0
+        self._lock_file = None
+        self._token = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """Starts the publisher thread in this process (idempotent; safe across fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.is_leader = False
+            self._lock_file = None
+            self._thread = threading.Thread(target=self._run, name="snapshot-publisher", daemon=True)
+            self._thread.start()
+
+    def poke(self, *args):
+        self._wakeup.set()
+
+    def _try_lead(self):
+        if fcntl is None:
+            return False
+        if self._lock_file is None:
+            self._lock_file = open(f"{self.shared.path}.lock", "a")
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def publish_once(self):
+        """Publishes if the change token moved. Returns True when a new snapshot went out."""
+        token = self.change_token()
+        if token == self._token:
+            self.shared.heartbeat()
+            return False
+        state, token = live_updates.consistent_state(self.compute_state, self.change_token, token)
+        payload = {"version": token, "state": state, "pid": os.getpid()}
+        self.shared.publish(serialization.dumps(payload))
+        self._token = token
+        self.publishes += 1
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                if not self.is_leader:
+                    self.is_leader = self._try_lead()
+                if self.is_leader:
+                    self.publish_once()
+            except Exception as e:
+                print(f"Error publishing shared snapshot: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
@@ -0,0 +1,276 @@
+import math
+import os
+import random
+import threading
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import time_rollups
+
+# Configuration
+SKETCH_KLL_K = int(os.environ.get("SKETCH_KLL_K", "200"))                 # Accuracy/size of each quantile sketch
+SKETCH_HLL_PRECISION = int(os.environ.get("SKETCH_HLL_PRECISION", "12"))  # 2**p one-byte registers per HLL
+SKETCH_BUCKET_RETENTION = int(os.environ.get("SKETCH_BUCKET_RETENTION", "30"))  # Daily HLLs kept individually
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch: a stack of compactors where level h holds items of weight 2**h.
+    When the stack is over capacity, an overfull level is sorted and every other item (random offset) moves up a level, so
+    memory stays under ~3k values however many are added (rank error well under 1% at k=200).
+    Sketches with the same k merge by concatenating levels and compacting.
+    """
+
+    def __init__(self, k=SKETCH_KLL_K):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._pending = []  # Single updates, flushed to level 0 in batches
+        self._rng = random.Random()
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        # Lazy compaction: only compact while the whole stack is over its total capacity,
+        # always at the lowest overfull level, so the sketch stays close to full (more accurate)
+        while True:
+            capacities = [self._capacity(level) for level in range(len(self.levels))]
+            if sum(len(items) for items in self.levels) <= sum(capacities):
+                return
+            level = next(h for h, items in enumerate(self.levels) if len(items) > capacities[h])
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            keep = items[-1:] if len(items) % 2 else items[:0]
+            items = items[:len(items) - len(keep)]
+            promoted = items[self._rng.randint(0, 1)::2]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            self.levels[level] = keep
+
+    def _flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.update_many(pending)
+
+    def update(self, value):
+        self._pending.append(value)
+        if len(self._pending) >= self.k:
+            self._flush()
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other):
+        other._flush()
+        self._flush()
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Estimated values at each rank fraction in `qs` (None when empty)."""
+        self._flush()
+        if self.n == 0:
+            return [None for _ in qs]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.float64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, cumulative = values[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return [float(values[min(pos, len(values) - 1)]) for pos in positions]
+
+    def size(self):
+        """Stored values (the sketch's memory in float64s)."""
+        return sum(len(items) for items in self.levels) + len(self._pending)
+
+
+def _bit_length(values):
+    """Vectorized int.bit_length() for a uint64 array."""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= np.uint64(1 << shift)
+        length += wide * shift
+        values = np.where(wide, values >> np.uint64(shift), values)
+    return length + (values > 0)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter: 2**p one-byte registers (4 KiB at p=12, ~1.6% error).
+    Merging is a register-wise max, so per-bucket or per-worker counters combine exactly.
+    """
+
+    def __init__(self, p=SKETCH_HLL_PRECISION):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update_many(self, items):
+        items = np.asarray(items, dtype=object)
+        if len(items) == 0:
+            return
+        hashes = pd.util.hash_array(items)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def update(self, item):
+        self.update_many([item])
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class SketchStore:
+    """
+    Constant-memory distribution metrics for the dashboard: KLL quantiles of order value and
+    quantity globally and per Region and Channel, and HyperLogLog distinct products per day.
+    Each transaction is applied once (tracked by TransactionID). Daily HLLs older than
+    SKETCH_BUCKET_RETENTION days are folded into one, so memory does not grow with history.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.watermark = 0  # Highest TransactionID applied so far
+        self.quantile_sketches = {}  # (metric, dimension, group) -> KLLSketch
+        self.daily_products = {}     # day start (epoch seconds) -> HyperLogLog
+        self.older_products = HyperLogLog()
+        self.all_products = HyperLogLog()
+
+    def _kll(self, metric, dimension, group):
+        key = (metric, dimension, group)
+        sketch = self.quantile_sketches.get(key)
+        if sketch is None:
+            sketch = self.quantile_sketches[key] = KLLSketch()
+        return sketch
+
+    def _day(self, day):
+        hll = self.daily_products.get(day)
+        if hll is None:
+            hll = self.daily_products[day] = HyperLogLog()
+            while len(self.daily_products) > SKETCH_BUCKET_RETENTION:
+                self.older_products.merge(self.daily_products.pop(min(self.daily_products)))
+        return hll
+
+    def add(self, record):
+        """Applies a single transaction dict. Returns True if it was new."""
+        txn_id = record.get('TransactionID')
+        if txn_id is None:
+            return False
+        with self._lock:
+            if not aggregates.is_next(int(txn_id), self.watermark):
+                return False
+            self.watermark = int(txn_id)
+            value = float(record.get('TotalPrice') or 0.0)
+            quantity = int(record.get('Quantity') or 0)
+            for dimension, group in (("global", None), ("region", record.get('Region')),
+                                     ("channel", record.get('Channel'))):
+                if dimension != "global" and group is None:
+                    continue
+                self._kll("order_value", dimension, group).update(value)
+                self._kll("quantity", dimension, group).update(quantity)
+            product = record.get('ProductID')
+            if product is not None:
+                if record.get('Timestamp') is not None:
+                    day = time_rollups.bucket_start(time_rollups.to_epoch_seconds(record['Timestamp']), "day")
+                    self._day(day).update(product)
+                self.all_products.update(product)
+        return True
+
+    def add_frame(self, df):
+        """Applies the rows of `df` (sorted by TransactionID) newer than the watermark in bulk. Returns how many."""
+        if df.empty or 'TransactionID' not in df.columns:
+            return 0
+        with self._lock:
+            new_rows = aggregates.rows_after(df, self.watermark)
+            if new_rows.empty:
+                return 0
+            values = new_rows['TotalPrice'].to_numpy(dtype=np.float64)
+            quantities = new_rows['Quantity'].to_numpy(dtype=np.float64)
+            self._kll("order_value", "global", None).update_many(values)
+            self._kll("quantity", "global", None).update_many(quantities)
+            for dimension, column in (("region", 'Region'), ("channel", 'Channel')):
+                for group, index in new_rows.groupby(column, observed=True).indices.items():
+                    self._kll("order_value", dimension, group).update_many(values[index])
+                    self._kll("quantity", dimension, group).update_many(quantities[index])
+
+            products = new_rows['ProductID'].to_numpy(dtype=object)
+            timestamps = new_rows['Timestamp']
+            if getattr(timestamps.dt, 'tz', None) is not None:
+                timestamps = timestamps.dt.tz_localize(None)
+            days = time_rollups.bucket_start(timestamps.to_numpy(dtype='datetime64[s]').astype(np.int64), "day")
+            for day in np.unique(days):
+                self._day(int(day)).update_many(products[days == day])
+            self.all_products.update_many(products)
+            self.watermark = int(new_rows['TransactionID'].iat[-1])
+            return len(new_rows)
+
+    def _percentiles(self, metric, dimension):
+        result = {}
+        for (sketch_metric, sketch_dimension, group), sketch in sorted(
+                self.quantile_sketches.items(), key=lambda item: str(item[0][2])):
+            if sketch_metric != metric or sketch_dimension != dimension:
+                continue
+            result[group or "all"] = dict(zip(QUANTILES, sketch.quantiles(list(QUANTILES.values()))))
+        return result
+
+    def summary(self, days=7):
+        """The dashboard's `sketches` block (distinct products for the last `days` days)."""
+        with self._lock:
+            summary = {}
+            for metric in ("order_value", "quantity"):
+                summary[metric] = {
+                    "global": self._percentiles(metric, "global").get("all"),
+                    "by_region": self._percentiles(metric, "region"),
+                    "by_channel": self._percentiles(metric, "channel"),
+                }
+            summary["distinct_products"] = {
+                "total": self.all_products.count(),
+                "daily": [
+                    {"Date": pd.Timestamp(day, unit='s').strftime('%Y-%m-%d'), "DistinctProducts": hll.count()}
+                    for day, hll in sorted(self.daily_products.items())[-days:]
+                ],
+            }
+            return summary
+
+    def distinct_products(self, start_day=None, end_day=None):
+        """Distinct products across the retained daily buckets in [start_day, end_day] (epoch seconds), merged."""
+        with self._lock:
+            merged = HyperLogLog()
+            for day, hll in self.daily_products.items():
+                if (start_day is None or day >= start_day) and (end_day is None or day <= end_day):
+                    merged.merge(hll)
+            return merged.count()
+
+    def memory_bytes(self):
+        with self._lock:
+            kll = sum(sketch.size() for sketch in self.quantile_sketches.values()) * 8
+            hll = (len(self.daily_products) + 2) * (1 << SKETCH_HLL_PRECISION)
+            return kll + hll
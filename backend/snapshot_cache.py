@@ -0,0 +1,116 @@
+import threading
+import time
+
+
+class SnapshotCache:
+    """
+    Process-wide cache around an expensive loader (e.g. a full Supabase fetch).
+    A snapshot is reused until it is older than `ttl` seconds or explicitly invalidated.
+    Concurrent callers that miss while a load is running wait for that single load
+    instead of each starting their own (single-flight).
+    """
+
+    def __init__(self, loader, ttl=2.0, name="snapshot", track_changes=False):
+        self.loader = loader
+        self.ttl = ttl
+        self.name = name
+        # With track_changes, data_version is bumped whenever a load returns a different value
+        # (only for cheaply comparable values such as dicts or flags, not DataFrames)
+        self.track_changes = track_changes
+        self.data_version = 0
+        self._cond = threading.Condition()
+        self._value = None
+        self._loaded_at = 0.0
+        self._generation = 0   # Bumped by invalidate() and update(); a load started before it is not trusted as fresh
+        self._loading = False
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.loads = 0
+        self.errors = 0
+
+    def _is_fresh(self):
+        return self._value is not None and (time.monotonic() - self._loaded_at) < self.ttl
+
+    def fresh(self):
+        """True if get() would return without loading."""
+        with self._cond:
+            return self._is_fresh()
+
+    def get(self):
+        with self._cond:
+            if self._is_fresh():
+                self.hits += 1
+                return self._value
+
+            if self._loading:
+                # Someone else is already loading: piggyback on their result
+                self.waits += 1
+                while self._loading:
+                    self._cond.wait()
+                if self._value is not None:
+                    self.hits += 1
+                    return self._value
+
+            self.misses += 1
+            self._loading = True
+            generation = self._generation
+
+        value = None
+        try:
+            value = self.loader()
+            self.loads += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Error loading {self.name}: {e}")
+        finally:
+            with self._cond:
+                if value is not None:
+                    if self.track_changes and value != self._value:
+                        self.data_version += 1
+                    self._value = value
+                    # A write landed mid-load: keep the data but let the next call reload
+                    self._loaded_at = time.monotonic() if generation == self._generation else 0.0
+                self._loading = False
+                self._cond.notify_all()
+
+        return value if value is not None else self._value
+
+    def update(self, mutator):
+        """
+        Write-through: replaces the cached value with mutator(value) without reloading.
+        Falls back to invalidation when nothing is cached yet.
+        """
+        with self._cond:
+            if self._value is None:
+                self._loaded_at = 0.0
+                self._generation += 1
+                return
+            value = mutator(self._value)
+            if self.track_changes and value != self._value:
+                self.data_version += 1
+            self._value = value
+            # A load already in flight read pre-write data: don't let it come back as fresh
+            self._generation += 1
+
+    def invalidate(self):
+        """Marks the current snapshot stale so the next get() reloads it."""
+        with self._cond:
+            self._loaded_at = 0.0
+            self._generation += 1
+
+    def stats(self):
+        with self._cond:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "ttl_seconds": self.ttl,
+                "data_version": self.data_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "loads": self.loads,
+                "errors": self.errors,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "age_seconds": (time.monotonic() - self._loaded_at) if self._loaded_at else None,
+            }
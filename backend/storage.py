@@ -0,0 +1,281 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+import metrics
+
+# Configuration
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "sales_data.db")
+
+
+def normalize_transactions(data):
+    """Builds a DataFrame from raw rows (or a frame), handles mixed schema, and polyfills missing data."""
+    if data is None or len(data) == 0:
+        return pd.DataFrame()
+
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+
+    # SCHEMA MAPPING (Mixed DB -> Pascal App)
+    rename_map = {
+        'price_per_unit': 'PricePerUnit',
+        'total_price': 'TotalPrice',
+        'region': 'Region',
+        'product_id': 'ProductID',
+        # 'Timestamp' and 'Quantity' seem to match Pascal based on error hints
+    }
+    df.rename(columns=rename_map, inplace=True)
+
+    # Ensure timestamp is datetime
+    if 'Timestamp' in df.columns:
+        with metrics.stage("to_datetime"):
+            df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+
+    # POLYFILLS for missing columns
+    if 'TotalCost' not in df.columns:
+        if 'TotalPrice' in df.columns:
+            df['TotalCost'] = df['TotalPrice'] * 0.7
+        else:
+            df['TotalCost'] = 0.0
+
+    if 'Channel' not in df.columns:
+        df['Channel'] = 'Webstore'
+
+    if 'ProductID' not in df.columns and 'product_id' not in df.columns:
+         pass # Hopefully ProductID came through
+
+    return df
+
+
+class StorageBackend:
+    """
+    Where transactions, restock logs and the pipeline status live.
+    db_utils talks to exactly one backend (STORAGE_BACKEND) and keeps the error handling;
+    backends just raise. Records passed in use the app's PascalCase schema.
+    """
+    name = None
+
+    def migrate(self):
+        """One-time setup (schema, seed data). Safe to call more than once."""
+
+    def iter_transaction_pages(self, after_id, page_size):
+        """Yields lists of raw rows with TransactionID > after_id, in TransactionID order."""
+        raise NotImplementedError
+
+    def read_transactions(self, after_id, page_size):
+        """Every transaction with TransactionID > after_id as a normalized DataFrame."""
+        data = []
+        for page in self.iter_transaction_pages(after_id, page_size):
+            data.extend(page)
+        return normalize_transactions(data)
+
+    def max_transaction_id(self):
+        """The highest stored TransactionID (0 for an empty table)."""
+        raise NotImplementedError
+
+    def upsert_transactions(self, records):
+        """Inserts or replaces records keyed on TransactionID."""
+        raise NotImplementedError
+
+    def insert_transaction(self, record):
+        self.upsert_transactions([record])
+
+    def add_restock(self, product_id, quantity, timestamp):
+        raise NotImplementedError
+
+    def restock_logs(self, product_id=None):
+        """The full restock log (for audit), optionally for one product, as a list of row dicts."""
+        raise NotImplementedError
+
+    def restock_totals(self):
+        """Total restocked quantity per product (backends override this with a maintained summary)."""
+        totals = {}
+        for row in self.restock_logs():
+            pid = row.get('product_id')
+            totals[pid] = totals.get(pid, 0) + (row.get('quantity') or 0)
+        return totals
+
+    def get_pipeline_status(self):
+        raise NotImplementedError
+
+    def set_pipeline_status(self, active, updated_at):
+        raise NotImplementedError
+
+    def reorder_points(self):
+        """Stored per-product reorder points as {product_id: level}."""
+        raise NotImplementedError
+
+    def set_reorder_point(self, product_id, level, updated_at):
+        raise NotImplementedError
+
+
+SALES_COLUMNS = ['TransactionID', 'Timestamp', 'ProductID', 'Quantity', 'PricePerUnit',
+                 'CostPerUnit', 'TotalPrice', 'TotalCost', 'Region', 'Channel']
+
+
+def _sqlite_timestamp(value):
+    """One text format for every stored timestamp, so reads parse a uniform column."""
+    if value is None:
+        return None
+    return pd.Timestamp(value).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    Local SQLite database in WAL mode: readers (gunicorn workers) never block the
+    generator's writes and vice versa. Indexed on Timestamp and ProductID for sales and
+    product_id for restocks; TransactionID is the rowid, so keyset pages are range scans.
+    Each thread gets its own connection.
+    """
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._create_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sales_data (
+                TransactionID INTEGER PRIMARY KEY,
+                Timestamp TEXT NOT NULL,
+                ProductID TEXT,
+                Quantity INTEGER,
+                PricePerUnit REAL,
+                CostPerUnit REAL,
+                TotalPrice REAL,
+                TotalCost REAL,
+                Region TEXT,
+                Channel TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_sales_timestamp ON sales_data (Timestamp);
+            CREATE INDEX IF NOT EXISTS idx_sales_product ON sales_data (ProductID);
+
+            CREATE TABLE IF NOT EXISTS restock_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                timestamp TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_restock_product ON restock_logs (product_id);
+
+            -- Maintained per-product totals, kept in step with restock_logs by a trigger
+            CREATE TABLE IF NOT EXISTS restock_totals (
+                product_id TEXT PRIMARY KEY,
+                total_quantity INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TRIGGER IF NOT EXISTS restock_logs_totals AFTER INSERT ON restock_logs
+            BEGIN
+                INSERT INTO restock_totals (product_id, total_quantity) VALUES (NEW.product_id, NEW.quantity)
+                ON CONFLICT (product_id) DO UPDATE SET total_quantity = total_quantity + excluded.total_quantity;
+            END;
+
+            CREATE TABLE IF NOT EXISTS pipeline_status (
+                id INTEGER PRIMARY KEY,
+                active INTEGER NOT NULL DEFAULT 1,
+                updated_at TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS reorder_points (
+                product_id TEXT PRIMARY KEY,
+                level INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+        """)
+        conn.commit()
+
+    def migrate(self):
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO pipeline_status (id, active, updated_at) VALUES (1, 1, ?)",
+                     (datetime.now().isoformat(),))
+        # Backfill totals for logs written before restock_totals existed
+        conn.execute("INSERT OR IGNORE INTO restock_totals (product_id, total_quantity) "
+                     "SELECT product_id, SUM(quantity) FROM restock_logs GROUP BY product_id")
+        conn.commit()
+
+    def iter_transaction_pages(self, after_id, page_size):
+        conn = self._conn()
+        last_id = after_id
+        while True:
+            rows = conn.execute(
+                "SELECT * FROM sales_data WHERE TransactionID > ? ORDER BY TransactionID LIMIT ?",
+                (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]['TransactionID']
+
+    def max_transaction_id(self):
+        return self._conn().execute("SELECT COALESCE(MAX(TransactionID), 0) FROM sales_data").fetchone()[0]
+
+    def read_transactions(self, after_id, page_size):
+        # Straight into a frame: no per-row dicts on the local fast path
+        df = pd.read_sql_query(
+            "SELECT * FROM sales_data WHERE TransactionID > ? ORDER BY TransactionID",
+            self._conn(), params=(after_id,))
+        return normalize_transactions(df)
+
+    def upsert_transactions(self, records):
+        rows = [
+            tuple(_sqlite_timestamp(record.get(col)) if col == 'Timestamp' else record.get(col)
+                  for col in SALES_COLUMNS)
+            for record in records
+        ]
+        conn = self._conn()
+        conn.executemany(
+            f"INSERT OR REPLACE INTO sales_data ({', '.join(SALES_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in SALES_COLUMNS)})", rows)
+        conn.commit()
+
+    def add_restock(self, product_id, quantity, timestamp):
+        conn = self._conn()
+        conn.execute("INSERT INTO restock_logs (product_id, quantity, timestamp) VALUES (?, ?, ?)",
+                     (product_id, quantity, timestamp))
+        conn.commit()
+
+    def restock_logs(self, product_id=None):
+        if product_id is None:
+            rows = self._conn().execute("SELECT * FROM restock_logs ORDER BY id")
+        else:
+            rows = self._conn().execute("SELECT * FROM restock_logs WHERE product_id = ? ORDER BY id", (product_id,))
+        return [dict(row) for row in rows]
+
+    def restock_totals(self):
+        rows = self._conn().execute("SELECT product_id, total_quantity FROM restock_totals")
+        return {row['product_id']: row['total_quantity'] for row in rows}
+
+    def get_pipeline_status(self):
+        row = self._conn().execute("SELECT active FROM pipeline_status WHERE id = 1").fetchone()
+        return bool(row['active']) if row else True
+
+    def set_pipeline_status(self, active, updated_at):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO pipeline_status (id, active, updated_at) VALUES (1, ?, ?)",
+                     (1 if active else 0, updated_at))
+        conn.commit()
+
+    def reorder_points(self):
+        rows = self._conn().execute("SELECT product_id, level FROM reorder_points")
+        return {row['product_id']: row['level'] for row in rows}
+
+    def set_reorder_point(self, product_id, level, updated_at):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO reorder_points (product_id, level, updated_at) VALUES (?, ?, ?)",
+                     (product_id, int(level), updated_at))
+        conn.commit()
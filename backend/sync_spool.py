@@ -0,0 +1,141 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import db_utils
+
+# Configuration
+SPOOL_PATH = os.environ.get("SYNC_SPOOL_PATH", "sync_spool.db")
+SYNC_BATCH_SIZE = int(os.environ.get("SYNC_BATCH_SIZE", "500"))
+SYNC_FLUSH_INTERVAL = float(os.environ.get("SYNC_FLUSH_INTERVAL", "2.0"))   # seconds
+SYNC_MAX_BACKOFF = float(os.environ.get("SYNC_MAX_BACKOFF", "60.0"))        # seconds
+
+
+class SyncSpool:
+    """
+    Durable write-ahead spool between the generator and Supabase ("Smart Sync").
+    Rows are committed to a local SQLite file first and only deleted once a bulk
+    upsert has succeeded, so a network outage (or a crash) loses nothing.
+    A background worker drains the spool in batches by size or time, backing off
+    exponentially while Supabase is unreachable. Upserts are keyed on TransactionID,
+    so replaying a batch after a partial failure is idempotent.
+    """
+
+    def __init__(self, path=SPOOL_PATH, batch_size=SYNC_BATCH_SIZE,
+                 flush_interval=SYNC_FLUSH_INTERVAL, max_backoff=SYNC_MAX_BACKOFF, storage=None):
+        self.path = path
+        self.storage = storage  # Sync target; None means db_utils' configured backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.synced = 0
+        self.failures = 0
+        self.last_error = None
+        self.backoff = 0.0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " transaction_id INTEGER PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " enqueued_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def enqueue(self, record):
+        """Durably stores a record until it has been synced."""
+        payload = dict(record)
+        if hasattr(payload.get('Timestamp'), 'isoformat'):
+            payload['Timestamp'] = payload['Timestamp'].isoformat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spool (transaction_id, payload, enqueued_at) VALUES (?, ?, ?)",
+                (int(payload['TransactionID']), json.dumps(payload), time.time()),
+            )
+            self._conn.commit()
+        # Wake the worker early for a full batch, unless it is backing off from a failure
+        if not self.backoff and self.depth() >= self.batch_size:
+            self._wakeup.set()
+
+    def depth(self):
+        """Number of rows waiting to be synced (queue-depth metric)."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def drain_once(self):
+        """Pushes one batch to Supabase. Returns the number of rows synced (0 on failure or when empty)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT transaction_id, payload FROM spool ORDER BY transaction_id LIMIT ?",
+                (self.batch_size,),
+            ).fetchall()
+        if not rows:
+            return 0
+
+        ids = [row[0] for row in rows]
+        records = [json.loads(row[1]) for row in rows]
+        if not db_utils.upsert_transactions(records, storage=self.storage):
+            with self._lock:
+                self._conn.executemany("UPDATE spool SET attempts = attempts + 1 WHERE transaction_id = ?",
+                                       [(i,) for i in ids])
+                self._conn.commit()
+            self.failures += 1
+            self.last_error = time.time()
+            return 0
+
+        with self._lock:
+            self._conn.executemany("DELETE FROM spool WHERE transaction_id = ?", [(i,) for i in ids])
+            self._conn.commit()
+        self.synced += len(ids)
+        return len(ids)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.backoff or self.flush_interval)
+            self._wakeup.clear()
+            while not self._stop.is_set():
+                if self.depth() == 0:
+                    self.backoff = 0.0
+                    break
+                if self.drain_once() == 0:
+                    # Supabase unreachable: exponential backoff with jitter
+                    self.backoff = min(self.max_backoff, max(1.0, self.backoff * 2)) * random.uniform(0.8, 1.2)
+                    print(f"Sync failed, {self.depth()} rows spooled. Retrying in {self.backoff:.1f}s")
+                    break
+                self.backoff = 0.0
+
+    def start(self):
+        """Starts the background sync worker."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sync-spool", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush=True):
+        """Stops the worker; with flush=True makes one last attempt to drain the spool."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        if flush:
+            while self.depth() and self.drain_once():
+                pass
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "synced": self.synced,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "backoff_seconds": self.backoff,
+        }
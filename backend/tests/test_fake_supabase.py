@@ -0,0 +1,42 @@
+import fake_supabase
+
+
+def test_keyset_pagination_returns_every_row_once_in_order():
+    fake = fake_supabase.FakeSupabase()
+    fake.seed_sales(2500)
+    seen = []
+    last_id = 0
+    while True:
+        page = fake.table("sales_data").select("*").gt("TransactionID", last_id) \
+            .order("TransactionID").limit(1000).execute().data
+        if not page:
+            break
+        seen.extend(row["TransactionID"] for row in page)
+        last_id = page[-1]["TransactionID"]
+    assert seen == list(range(1, 2501))
+
+
+def test_upsert_replaces_rows_by_primary_key():
+    fake = fake_supabase.FakeSupabase()
+    fake.table("reorder_points").upsert({"product_id": "Beanie Hat", "level": 10}).execute()
+    fake.table("reorder_points").upsert({"product_id": "Beanie Hat", "level": 25}).execute()
+    assert fake.table("reorder_points").select("*").execute().data == [{"product_id": "Beanie Hat", "level": 25}]
+
+
+def test_restock_inserts_maintain_the_totals_table():
+    fake = fake_supabase.FakeSupabase()
+    fake.table("restock_logs").insert({"product_id": "Beanie Hat", "quantity": 5, "timestamp": "t"}).execute()
+    fake.table("restock_logs").insert([
+        {"product_id": "Beanie Hat", "quantity": 7, "timestamp": "t"},
+        {"product_id": "Maxi Skirt", "quantity": 3, "timestamp": "t"},
+    ]).execute()
+    totals = fake.table("restock_totals").select("*").execute().data
+    assert {row["product_id"]: row["total_quantity"] for row in totals} == {"Beanie Hat": 12, "Maxi Skirt": 3}
+    assert [row["id"] for row in fake.table("restock_logs").select("*").execute().data] == [1, 2, 3]
+
+
+def test_max_transaction_id_query():
+    fake = fake_supabase.FakeSupabase()
+    fake.seed_sales(300)
+    rows = fake.table("sales_data").select("TransactionID").order("TransactionID", desc=True).limit(1).execute().data
+    assert [row["TransactionID"] for row in rows] == [300]
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import inventory_ledger
+import sketches
+import time_rollups
+import top_k
+
+try:
+    import duckdb_engine
+except ImportError:
+    duckdb_engine = None
+
+PRODUCTS = ["Beanie Hat", "Maxi Skirt", "Cargo Shorts"]
+
+
+def _frame(first_id, n):
+    ids = np.arange(first_id, first_id + n)
+    return pd.DataFrame({
+        "TransactionID": ids,
+        "Timestamp": pd.Timestamp("2026-01-01") + pd.to_timedelta(ids, unit="min"),
+        "ProductID": [PRODUCTS[i % 3] for i in ids],
+        "Quantity": ids % 4 + 1,
+        "PricePerUnit": 10.0 + ids % 5,
+        "CostPerUnit": 6.0 + ids % 5,
+        "TotalPrice": (10.0 + ids % 5) * (ids % 4 + 1),
+        "TotalCost": (6.0 + ids % 5) * (ids % 4 + 1),
+        "Region": ["North" if i % 2 else "South" for i in ids],
+        "Channel": "Webstore",
+    })
+
+
+def _record(df, index):
+    return {key: (value.item() if hasattr(value, "item") else value) for key, value in df.iloc[index].items()}
+
+
+def _stores():
+    stores = {
+        "aggregates": aggregates.AggregateStore,
+        "ledger": lambda: inventory_ledger.InventoryLedger(PRODUCTS, reorder_points={}),
+        "rollups": time_rollups.TimeRollups,
+        "top_k": top_k.TopKIndex,
+        "sketches": sketches.SketchStore,
+    }
+    if duckdb_engine is not None and duckdb_engine.duckdb is not None:
+        stores["duckdb"] = lambda: duckdb_engine.DuckDBEngine(":memory:")
+    return stores
+
+
+@pytest.fixture(params=sorted(_stores()))
+def store(request):
+    return _stores()[request.param]()
+
+
+def test_rows_after_slices_a_sorted_frame():
+    df = _frame(1, 10)
+    assert aggregates.rows_after(df, 0)["TransactionID"].tolist() == list(range(1, 11))
+    assert aggregates.rows_after(df, 7)["TransactionID"].tolist() == [8, 9, 10]
+    assert aggregates.rows_after(df, 10).empty
+    gaps = df[df["TransactionID"] % 2 == 0]
+    assert aggregates.rows_after(gaps, 5)["TransactionID"].tolist() == [6, 8, 10]
+
+
+def test_record_past_a_gap_is_left_for_add_frame(store):
+    df = _frame(1, 20)
+    store.add_frame(df.iloc[:10])
+    assert store.watermark == 10
+    assert not store.add(_record(df, 15))  # ID 16: rows 11-15 not applied yet
+    assert store.watermark == 10
+    assert store.add(_record(df, 10))      # ID 11 is next
+    assert store.watermark == 11
+    assert not store.add(_record(df, 10))  # Applied once
+    store.add_frame(df)
+    assert store.watermark == 20
+
+
+def test_mixed_single_and_frame_updates_match_one_pass():
+    df = _frame(1, 300)
+    incremental, reference = aggregates.AggregateStore(), aggregates.AggregateStore()
+    incremental.add(_record(df, 299))  # Before any frame: must not skip rows 1-299
+    incremental.add_frame(df.iloc[:100])
+    for index in range(100, 150):
+        incremental.add(_record(df, index))
+    incremental.add_frame(df)
+    reference.add_frame(df)
+    assert incremental.snapshot() == reference.snapshot()
+    assert incremental.snapshot()["total_revenue"] == pytest.approx(df["TotalPrice"].sum())
+    assert incremental.snapshot()["count"] == len(df)
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SEED_ON_STARTUP", "0")
+
+import db_utils
+import fake_supabase
+
+
+@pytest.fixture(scope="module")
+def seeded(tmp_path_factory):
+    os.environ["PIPELINE_STATUS_PATH"] = str(tmp_path_factory.mktemp("pipeline") / "status.json")
+    fake = fake_supabase.FakeSupabase()
+    fake.seed_defaults()
+    fake.seed_sales(1000)
+    db_utils.create_client = lambda url, key: fake
+    import app
+    return fake, app.app.test_client()
+
+
+def _sale(txn_id, product="Beanie Hat"):
+    return {"TransactionID": txn_id, "Timestamp": "2026-01-01 10:00:00", "ProductID": product,
+            "Quantity": 2, "TotalPrice": 10.0, "TotalCost": 7.0, "Region": "North", "Channel": "Webstore"}
+
+
+def test_ingest_before_the_first_read_keeps_every_row(seeded):
+    fake, client = seeded
+    assert client.post('/api/transactions', json=[_sale(1001)]).status_code == 200
+
+    stored = fake.tables["sales_data"].df
+    kpi = client.get('/api/dashboard-data').get_json()["kpi"]
+    assert kpi["total_revenue"] == pytest.approx(stored["total_price"].sum())
+
+    inventory = client.get('/api/inventory').get_json()
+    assert sum(row["sold"] for row in inventory) == stored["Quantity"].sum()
+    sold = {row["id"]: row["sold"] for row in inventory}
+    assert sold == stored.groupby("ProductID")["Quantity"].sum().to_dict()
+
+    revenue = stored.groupby("ProductID")["total_price"].sum().nlargest(5)
+    best = client.get('/api/best-sellers').get_json()
+    assert [row["product_id"] for row in best] == list(revenue.index)
+
+
+def test_ingest_after_a_read_moves_the_version(seeded):
+    fake, client = seeded
+    before = client.get('/api/dashboard-data')
+    assert client.post('/api/transactions', json=[_sale(1002, "Maxi Skirt")]).status_code == 200
+    after = client.get('/api/dashboard-data')
+    assert after.headers["ETag"] != before.headers["ETag"]
+    stored = fake.tables["sales_data"].df
+    assert after.get_json()["kpi"]["total_revenue"] == pytest.approx(stored["total_price"].sum())
+
+
+def test_ingest_rejects_ids_at_or_below_the_stored_max(seeded):
+    _, client = seeded
+    assert client.post('/api/transactions', json=[_sale(500)]).status_code == 400
+    assert client.post('/api/transactions', json=[_sale(2000), _sale(2000)]).status_code == 400
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import time_rollups
+
+
+def _rows(values):
+    return [{"Timestamp": i * 60, "Revenue": float(v)} for i, v in enumerate(values)]
+
+
+@pytest.mark.parametrize("n, threshold", [(10, 3), (1000, 50), (1001, 500), (5000, 499), (7, 6)])
+def test_keeps_endpoints_and_returns_exactly_threshold_points(n, threshold):
+    rows = _rows(np.random.default_rng(n).normal(100, 30, n))
+    sampled = time_rollups.lttb(rows, threshold, "Timestamp", "Revenue")
+    assert len(sampled) == threshold
+    assert sampled[0] is rows[0] and sampled[-1] is rows[-1]
+    timestamps = [row["Timestamp"] for row in sampled]
+    assert timestamps == sorted(set(timestamps))  # Original rows, in order, none twice
+
+
+@pytest.mark.parametrize("n, threshold", [(0, 10), (5, 5), (5, 10), (100, 2), (100, 0)])
+def test_short_series_and_tiny_thresholds_pass_through(n, threshold):
+    rows = _rows(range(n))
+    assert time_rollups.lttb(rows, threshold, "Timestamp", "Revenue") is rows
+
+
+def test_one_point_per_bucket():
+    n, threshold = 1002, 12
+    rows = _rows(np.random.default_rng(1).uniform(0, 10, n))
+    indices = [row["Timestamp"] // 60 for row in time_rollups.lttb(rows, threshold, "Timestamp", "Revenue")]
+    every = (n - 2) / (threshold - 2)
+    buckets = [int((index - 1) // every) for index in indices[1:-1]]
+    assert buckets == list(range(threshold - 2))
+
+
+def test_spikes_survive_downsampling():
+    values = np.full(2000, 100.0)
+    values[[333, 1500]] = [5000.0, -4000.0]
+    sampled = time_rollups.lttb(_rows(values), 20, "Timestamp", "Revenue")
+    revenues = [row["Revenue"] for row in sampled]
+    assert 5000.0 in revenues and -4000.0 in revenues
+
+
+def test_series_caps_points_and_reports_total_buckets():
+    rollups = time_rollups.TimeRollups()
+    n = 3000
+    rollups.add_frame(pd.DataFrame({
+        "TransactionID": np.arange(1, n + 1),
+        "Timestamp": pd.Timestamp("2026-01-01") + pd.to_timedelta(np.arange(n), unit="min"),
+        "TotalPrice": np.linspace(1, 50, n),
+        "TotalCost": np.linspace(1, 30, n),
+        "Quantity": np.ones(n, dtype=int),
+    }))
+    rows, total = rollups.series("minute", max_points=100)
+    assert total == n and len(rows) == 100
+    assert rows[0]["Timestamp"] == rollups.keys["minute"][0] and rows[-1]["Timestamp"] == rollups.keys["minute"][-1]
+    rows, total = rollups.series("day", max_points=100)
+    assert len(rows) == total == 3
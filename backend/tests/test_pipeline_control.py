@@ -0,0 +1,40 @@
+import threading
+import time
+
+import pipeline_control
+
+
+def test_status_reads_never_wait_for_storage(tmp_path):
+    stored = {"active": True}
+    loads = []
+    release = threading.Event()
+
+    def loader():
+        loads.append(1)
+        if len(loads) > 1:
+            release.wait(5)  # A slow storage read in the background
+        return stored["active"]
+
+    control = pipeline_control.PipelineControl(str(tmp_path / "status.json"), port=0, loader=loader,
+                                               sync_interval=0.05)
+    assert loads == [1]  # The startup read
+    started = time.perf_counter()
+    for _ in range(200):
+        assert control.is_active()
+    assert time.perf_counter() - started < 1.0
+    stored["active"] = False
+    release.set()
+    deadline = time.monotonic() + 5
+    while control.is_active() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert control.is_active() is False
+    assert control.state()["generation"] == 1
+
+
+def test_local_change_reaches_other_instances_through_the_file(tmp_path):
+    path = str(tmp_path / "status.json")
+    writer = pipeline_control.PipelineControl(path, port=0)
+    reader = pipeline_control.PipelineControl(path, port=0)
+    writer.set_active(False)
+    assert reader.is_active() is False
+    assert reader.state()["generation"] == writer.state()["generation"]
@@ -0,0 +1,124 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+import shared_snapshot
+
+SIZE = 1024 * 1024
+
+
+def _payload(i):
+    # Every payload has the same length, so a torn read still parses: only the seqlock can catch it
+    return json.dumps({"n": i, "data": [f"{i:06d}"] * 2000}).encode()
+
+
+def _publish_many(path, count, done):
+    writer = shared_snapshot.SharedSnapshot(path, SIZE)
+    for i in range(1, count + 1):
+        writer.publish(_payload(i))
+    done.set()
+
+
+def _slot_seq(snapshot, generation):
+    return shared_snapshot.SLOT_HEADER.unpack_from(snapshot._mm, snapshot._slot_offset(generation))[0]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork for a concurrent writer process")
+def test_reader_never_sees_a_torn_snapshot(tmp_path):
+    path = str(tmp_path / "snapshot")
+    reader = shared_snapshot.SharedSnapshot(path, SIZE)
+    context = multiprocessing.get_context("fork")
+    done = context.Event()
+    writer = context.Process(target=_publish_many, args=(path, 3000, done))
+    writer.start()
+    last, reads = 0, 0
+    while not done.is_set():
+        value = reader.read(max_age=60)
+        if value is None:
+            continue
+        reads += 1
+        assert set(value["data"]) == {f"{value['n']:06d}"}
+        assert value["n"] >= last  # Generations only move forward
+        last = value["n"]
+    writer.join(10)
+    assert writer.exitcode == 0
+    assert reads > 0
+    assert reader.read(max_age=60)["n"] == 3000
+
+
+def test_reader_lapped_mid_copy_retries(tmp_path, monkeypatch):
+    path = str(tmp_path / "snapshot")
+    writer, reader = shared_snapshot.SharedSnapshot(path, SIZE), shared_snapshot.SharedSnapshot(path, SIZE)
+    writer.publish(_payload(1))
+
+    class LappedDecoder:
+        """Copies the first half of the slot, lets the writer publish twice (reusing that slot), then the rest."""
+        calls = 0
+
+        @classmethod
+        def loads(cls, view):
+            cls.calls += 1
+            if cls.calls > 1:
+                return json.loads(bytes(view))
+            half = len(view) // 2
+            data = bytes(view[:half])
+            writer.publish(_payload(2))
+            writer.publish(_payload(3))
+            return json.loads(data + bytes(view[half:]))
+
+    monkeypatch.setattr(shared_snapshot, "orjson", LappedDecoder)
+    value = reader.read()
+    assert set(value["data"]) == {f"{value['n']:06d}"}
+    assert value["n"] == 3
+    assert reader.retries == 1
+
+
+def test_read_follows_published_generations(tmp_path):
+    path = str(tmp_path / "snapshot")
+    writer, reader = shared_snapshot.SharedSnapshot(path, SIZE), shared_snapshot.SharedSnapshot(path, SIZE)
+    assert reader.read() is None
+    assert writer.publish(b'{"n": 1}') == 1
+    first = reader.read()
+    assert first == {"n": 1}
+    assert reader.read() is first  # Decoded once per generation
+    writer.publish(b'{"n": 2}')
+    assert reader.read() == {"n": 2}
+    assert _slot_seq(writer, 1) % 2 == 0 and _slot_seq(writer, 2) % 2 == 0
+
+
+def test_slot_being_written_is_not_read(tmp_path):
+    path = str(tmp_path / "snapshot")
+    writer = shared_snapshot.SharedSnapshot(path, SIZE)
+    writer.publish(b'{"n": 1}')
+    offset = writer._slot_offset(1)
+    seq, length = shared_snapshot.SLOT_HEADER.unpack_from(writer._mm, offset)
+    shared_snapshot.SLOT_HEADER.pack_into(writer._mm, offset, seq + 1, length)  # Writer lapped the reader mid-write
+
+    reader = shared_snapshot.SharedSnapshot(path, SIZE)
+    assert reader.read() is None
+    assert reader.retries > 0
+
+    shared_snapshot.SLOT_HEADER.pack_into(writer._mm, offset, seq + 2, length)
+    assert reader.read() == {"n": 1}
+
+
+def test_publish_recovers_from_a_writer_that_died_mid_write(tmp_path):
+    path = str(tmp_path / "snapshot")
+    writer = shared_snapshot.SharedSnapshot(path, SIZE)
+    writer.publish(b'{"n": 1}')
+    shared_snapshot.SLOT_HEADER.pack_into(writer._mm, writer._slot_offset(2), 7, 0)  # Odd: abandoned publish
+    successor = shared_snapshot.SharedSnapshot(path, SIZE)
+    assert successor.publish(b'{"n": 2}') == 2
+    assert _slot_seq(successor, 2) % 2 == 0
+    assert shared_snapshot.SharedSnapshot(path, SIZE).read() == {"n": 2}
+
+
+def test_stale_heartbeat_and_oversized_payload(tmp_path):
+    path = str(tmp_path / "snapshot")
+    writer = shared_snapshot.SharedSnapshot(path, SIZE)
+    writer.publish(b'{"n": 1}')
+    assert shared_snapshot.SharedSnapshot(path, SIZE).read(max_age=-1) is None
+    with pytest.raises(ValueError):
+        writer.publish(b"x" * writer.slot_size)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import sketches
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def _kll(values, k=200, seed=0):
+    sketch = sketches.KLLSketch(k)
+    sketch._rng.seed(seed)
+    sketch.update_many(values)
+    return sketch
+
+
+def _rank_errors(sketch, values):
+    """|estimated rank - requested rank| per quantile, against the exact sorted data."""
+    exact = np.sort(values)
+    estimates = sketch.quantiles(QS)
+    return [abs(np.searchsorted(exact, estimate, side="right") / len(exact) - q) for q, estimate in zip(QS, estimates)]
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "lognormal", "integers"])
+def test_kll_rank_error_within_one_percent(distribution):
+    rng = np.random.default_rng(7)
+    values = {
+        "uniform": rng.uniform(0, 1000, 200_000),
+        "lognormal": rng.lognormal(3, 1.5, 200_000),
+        "integers": rng.integers(1, 10, 200_000).astype(float),  # Basket sizes: heavy ties
+    }[distribution]
+    sketch = _kll(values)
+    if distribution == "integers":
+        # With ties the estimate must be the exact value at each rank
+        assert sketch.quantiles(QS) == [float(v) for v in np.quantile(values, QS, method="inverted_cdf")]
+    else:
+        assert max(_rank_errors(sketch, values)) < 0.01
+    assert sketch.n == len(values)
+    assert sketch.size() <= 3 * sketch.k
+
+
+def test_kll_single_updates_match_batch_bounds():
+    values = np.random.default_rng(3).normal(100, 15, 20_000)
+    sketch = sketches.KLLSketch(200)
+    sketch._rng.seed(0)
+    for value in values:
+        sketch.update(value)
+    assert max(_rank_errors(sketch, values)) < 0.01
+
+
+def test_kll_merge_matches_union():
+    rng = np.random.default_rng(11)
+    a, b = rng.exponential(50, 100_000), rng.uniform(0, 400, 60_000)
+    merged = _kll(a, seed=1).merge(_kll(b, seed=2))
+    assert merged.n == len(a) + len(b)
+    assert max(_rank_errors(merged, np.concatenate([a, b]))) < 0.01
+
+
+def test_kll_small_inputs_are_exact():
+    sketch = _kll([5.0, 1.0, 3.0])
+    assert sketch.quantiles([0.0, 0.5, 1.0]) == [1.0, 3.0, 5.0]
+    assert sketches.KLLSketch().quantiles([0.5]) == [None]
+
+
+@pytest.mark.parametrize("n", [10, 1_000, 50_000, 300_000])
+def test_hll_count_error_within_bound(n):
+    hll = sketches.HyperLogLog(12)
+    hll.update_many([f"customer-{i}" for i in range(n)])
+    # Standard error at p=12 is 1.04 / sqrt(4096) ~ 1.6%; allow three of them
+    assert abs(hll.count() - n) <= max(0.05 * n, 1)
+
+
+def test_hll_duplicates_and_merge():
+    left, right = sketches.HyperLogLog(12), sketches.HyperLogLog(12)
+    left.update_many([f"item-{i}" for i in range(20_000)] * 3)
+    right.update_many([f"item-{i}" for i in range(10_000, 40_000)])
+    assert abs(left.count() - 20_000) <= 0.05 * 20_000
+    assert abs(left.merge(right).count() - 40_000) <= 0.05 * 40_000
@@ -0,0 +1,46 @@
+import numpy as np
+
+import top_k
+
+
+def _stream(seed=5, n=50_000, items=2_000):
+    rng = np.random.default_rng(seed)
+    keys = rng.zipf(1.3, n) % items
+    weights = rng.uniform(1, 100, n).round(2)
+    return [f"product-{key}" for key in keys], weights
+
+
+def test_space_saving_bounds_and_heavy_hitters():
+    items, weights = _stream()
+    exact, approx = top_k.ExactCounter(), top_k.SpaceSaving(capacity=100)
+    for item, weight in zip(items, weights):
+        exact.add(item, weight)
+        approx.add(item, weight)
+    assert len(approx.counts) <= 100
+    for item, estimate, error in approx.top(100):
+        true = exact.counts[item]
+        assert estimate - error - 1e-6 <= true <= estimate + 1e-6
+    # Anything above total / capacity must be monitored
+    threshold = sum(weights) / 100
+    heavy = {item for item, value in exact.counts.items() if value > threshold}
+    assert heavy and heavy <= set(approx.counts)
+
+
+def test_space_saving_top_matches_exact_for_skewed_data():
+    items, weights = _stream(seed=9)
+    exact, approx = top_k.ExactCounter(), top_k.SpaceSaving(capacity=200)
+    for item, weight in zip(items, weights):
+        exact.add(item, weight)
+        approx.add(item, weight)
+    assert [item for item, _, _ in approx.top(5)] == [item for item, _, _ in exact.top(5)]
+
+
+def test_space_saving_negative_weights_only_reduce_monitored_items():
+    counter = top_k.SpaceSaving(capacity=2)
+    counter.add("a", 10)
+    counter.add("b", 5)
+    counter.add("a", -4)
+    counter.add("c", -3)
+    assert counter.counts == {"a": 6, "b": 5}
+    counter.add("d", 1)  # Evicts the smallest counter, now "b"
+    assert counter.counts == {"a": 6, "d": 6} and counter.errors["d"] == 5
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+import transaction_buffer
+
+
+def _frame(first_id, n):
+    ids = np.arange(first_id, first_id + n)
+    return pd.DataFrame({
+        "TransactionID": ids,
+        "Timestamp": pd.Timestamp("2026-01-01") + pd.to_timedelta(ids, unit="s"),
+        "ProductID": np.where(ids % 3 == 0, "Beanie Hat", "Maxi Skirt"),
+        "Quantity": ids % 5 + 1,
+        "PricePerUnit": 19.99 + ids % 7,
+        "CostPerUnit": 9.5 + ids % 7,
+        "TotalPrice": (19.99 + ids % 7) * (ids % 5 + 1),
+        "TotalCost": (9.5 + ids % 7) * (ids % 5 + 1),
+        "Region": np.where(ids % 2 == 0, "North", "South"),
+        "Channel": "Webstore",
+    })
+
+
+def test_round_trip_keeps_values_and_money_precision():
+    buffer = transaction_buffer.TransactionBuffer(capacity=1000)
+    source = _frame(1, 500)
+    buffer.append_frame(source)
+    frame = buffer.frame()
+    assert list(frame.columns) == transaction_buffer.COLUMN_ORDER
+    for column in ("TransactionID", "Quantity", "PricePerUnit", "TotalPrice", "TotalCost"):
+        np.testing.assert_array_equal(frame[column].to_numpy(), source[column].to_numpy())
+        assert frame[column].dtype == transaction_buffer.NUMERIC_COLUMNS[column]
+    assert (frame["Timestamp"] == source["Timestamp"]).all()
+    assert frame["ProductID"].astype(str).tolist() == source["ProductID"].tolist()
+    assert frame["TotalPrice"].sum() == source["TotalPrice"].sum()
+
+
+def test_capacity_drops_oldest_rows():
+    buffer = transaction_buffer.TransactionBuffer(capacity=100)
+    for first_id in range(1, 301, 50):
+        buffer.append_frame(_frame(first_id, 50))
+    frame = buffer.frame()
+    assert frame["TransactionID"].tolist() == list(range(201, 301))
+    assert buffer.stats()["dropped_rows"] == 200
+
+
+def test_views_handed_out_survive_growth():
+    buffer = transaction_buffer.TransactionBuffer(capacity=10_000)
+    buffer.append_frame(_frame(1, 10))
+    before = buffer.frame()
+    for first_id in range(11, 10_011, 1000):
+        buffer.append_frame(_frame(first_id, 1000))
+    assert before["TransactionID"].tolist() == list(range(1, 11))
+    assert len(buffer) == 10_000
+
+
+def test_missing_categoricals_and_columns():
+    buffer = transaction_buffer.TransactionBuffer(capacity=10)
+    buffer.append_frame(pd.DataFrame({
+        "TransactionID": [1, 2],
+        "Timestamp": ["2026-01-01 10:00:00", "2026-01-01 10:00:01"],
+        "ProductID": ["Beanie Hat", None],
+        "Quantity": [1, 2],
+        "TotalPrice": [10.0, 20.0],
+    }))
+    frame = buffer.frame()
+    assert frame["ProductID"].isna().tolist() == [False, True]
+    assert frame["Region"].isna().all()
+    assert np.isnan(frame["TotalCost"]).all()
@@ -0,0 +1,172 @@
+import bisect
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+from aggregates import Totals
+
+# Configuration
+CHART_MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", "500"))  # Longer series are downsampled (LTTB)
+
+WEEK_OFFSET = 4 * 86400  # 1970-01-05 was a Monday: weeks start on Mondays
+GRANULARITIES = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+}
+LABEL_FORMATS = {
+    "minute": "%Y-%m-%d %H:%M",
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",       # Same labels as the dashboard's daily trends
+    "week": "%Y-%m-%d",      # The Monday the week starts on
+}
+
+
+def bucket_start(seconds, granularity):
+    """Start (epoch seconds) of the bucket holding `seconds`; works on ints and int64 arrays."""
+    width = GRANULARITIES[granularity]
+    offset = WEEK_OFFSET if granularity == "week" else 0
+    return (seconds - offset) // width * width + offset
+
+
+def to_epoch_seconds(timestamp):
+    """Naive timestamps are taken as-is (the app stores local wall-clock times)."""
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_localize(None)
+    return timestamp.value // 10**9
+
+
+def lttb(rows, threshold, x_key, y_key):
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps the first and last rows and, from each
+    of threshold - 2 buckets in between, the row forming the largest triangle with its
+    neighbours. Peaks and troughs survive, unlike plain averaging or striding.
+    """
+    n = len(rows)
+    if threshold >= n or threshold < 3:
+        return rows
+    x = np.array([row[x_key] for row in rows], dtype=np.float64)
+    y = np.array([row[y_key] for row in rows], dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        # Average of the next bucket (just the last point for the final bucket)
+        if end < n - 1:
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        selected.append(a)
+    selected.append(n - 1)
+    return [rows[i] for i in selected]
+
+
+class TimeRollups:
+    """
+    Revenue / cost / quantity / count per minute, hour, day and week bucket, maintained as
+    transactions arrive (each applied once, tracked by TransactionID). A range query touches
+    only the buckets in the window, found by binary search over the sorted bucket starts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.watermark = 0  # Highest TransactionID applied so far
+        self.buckets = {granularity: {} for granularity in GRANULARITIES}
+        self.keys = {granularity: [] for granularity in GRANULARITIES}  # Sorted bucket starts
+
+    def _entry(self, granularity, start):
+        buckets = self.buckets[granularity]
+        entry = buckets.get(start)
+        if entry is None:
+            entry = buckets[start] = Totals()
+            keys = self.keys[granularity]
+            if not keys or start > keys[-1]:
+                keys.append(start)  # The usual case: time moves forward
+            else:
+                bisect.insort(keys, start)
+        return entry
+
+    def add(self, record):
+        """Applies a single transaction dict. Returns True if it was new."""
+        txn_id = record.get('TransactionID')
+        timestamp = record.get('Timestamp')
+        if txn_id is None or timestamp is None:
+            return False
+        revenue = float(record.get('TotalPrice') or 0.0)
+        cost = record.get('TotalCost')
+        cost = float(cost) if cost is not None else revenue * 0.7
+        seconds = to_epoch_seconds(timestamp)
+        with self._lock:
+            if not aggregates.is_next(int(txn_id), self.watermark):
+                return False
+            self.watermark = int(txn_id)
+            for granularity in GRANULARITIES:
+                self._entry(granularity, bucket_start(seconds, granularity)).add(
+                    revenue, cost, int(record.get('Quantity') or 0))
+        return True
+
+    def add_frame(self, df):
+        """Applies the rows of `df` (sorted by TransactionID) newer than the watermark, one groupby per granularity. Returns how many."""
+        if df.empty or 'TransactionID' not in df.columns:
+            return 0
+        with self._lock:
+            new_rows = aggregates.rows_after(df, self.watermark)
+            if new_rows.empty:
+                return 0
+            timestamps = new_rows['Timestamp']
+            if getattr(timestamps.dt, 'tz', None) is not None:
+                timestamps = timestamps.dt.tz_localize(None)
+            seconds = timestamps.to_numpy(dtype='datetime64[s]').astype(np.int64)
+            values = pd.DataFrame({
+                "revenue": new_rows['TotalPrice'].to_numpy(dtype=np.float64),
+                "cost": new_rows['TotalCost'].to_numpy(dtype=np.float64),
+                "quantity": new_rows['Quantity'].to_numpy(dtype=np.int64),
+            })
+            for granularity in GRANULARITIES:
+                grouped = values.groupby(bucket_start(seconds, granularity)).agg(
+                    revenue=("revenue", "sum"), cost=("cost", "sum"),
+                    quantity=("quantity", "sum"), count=("revenue", "size"))
+                for start, revenue, cost, quantity, count in grouped.itertuples():
+                    entry = self._entry(granularity, int(start))
+                    entry.revenue += revenue
+                    entry.cost += cost
+                    entry.quantity += int(quantity)
+                    entry.count += int(count)
+            self.watermark = int(new_rows['TransactionID'].iat[-1])
+            return len(new_rows)
+
+    def query(self, granularity, start=None, end=None):
+        """Rows for the buckets overlapping [start, end] (timestamps or None for open ends), oldest first."""
+        label_format = LABEL_FORMATS[granularity]
+        with self._lock:
+            keys = self.keys[granularity]
+            lo = 0 if start is None else bisect.bisect_left(keys, bucket_start(to_epoch_seconds(start), granularity))
+            hi = len(keys) if end is None else bisect.bisect_right(keys, to_epoch_seconds(end))
+            buckets = self.buckets[granularity]
+            rows = []
+            for key in keys[lo:hi]:
+                t = buckets[key]
+                rows.append({
+                    "Date": pd.Timestamp(key, unit='s').strftime(label_format),
+                    "Timestamp": key,
+                    "Revenue": t.revenue,
+                    "Profit": t.profit,
+                    "Quantity": t.quantity,
+                    "Count": t.count,
+                })
+            return rows
+
+    def series(self, granularity, start=None, end=None, max_points=CHART_MAX_POINTS):
+        """query() downsampled (LTTB on revenue) to at most `max_points` rows. Returns (rows, total_buckets)."""
+        rows = self.query(granularity, start, end)
+        return lttb(rows, max_points, "Timestamp", "Revenue"), len(rows)
@@ -0,0 +1,148 @@
+import heapq
+import os
+import threading
+
+import aggregates
+
+# Configuration
+TOPK_MODE = os.environ.get("TOPK_MODE", "exact")                 # "exact" or "approximate" (Space-Saving)
+TOPK_CAPACITY = int(os.environ.get("TOPK_CAPACITY", "200"))      # Counters per list in approximate mode
+
+METRICS = ("revenue", "quantity", "profit")
+DIMENSIONS = {"global": None, "region": "Region", "channel": "Channel"}
+
+
+class ExactCounter:
+    """Every item's running total; top() is a heap selection over all of them."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, item, weight):
+        self.counts[item] = self.counts.get(item, 0) + weight
+
+    def top(self, k):
+        """(item, value, error) triples, largest first."""
+        return [(item, value, 0) for item, value in heapq.nlargest(k, self.counts.items(), key=lambda kv: kv[1])]
+
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving heavy hitters: at most `capacity` monitored items. An unmonitored item
+    takes over the smallest counter, inheriting its count as the error bound, so any item whose
+    true total exceeds (sum of weights) / capacity is guaranteed to be monitored.
+    Counts only grow, so the min-heap keeps one entry per item and stale entries are fixed lazily.
+    """
+
+    def __init__(self, capacity=TOPK_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._heap = []  # (count when pushed, item)
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts[item] == count:
+                return item
+            heapq.heappush(self._heap, (self.counts[item], item))
+
+    def add(self, item, weight):
+        if weight <= 0:
+            # Space-Saving needs non-negative weights: negative ones only reduce a monitored item
+            if item in self.counts and weight < 0:
+                self.counts[item] += weight
+                self._heap = [(count, key) for key, count in self.counts.items()]
+                heapq.heapify(self._heap)
+            return
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (weight, item))
+        else:
+            evicted = self._pop_min()
+            floor = self.counts.pop(evicted)
+            self.errors.pop(evicted)
+            self.counts[item] = floor + weight
+            self.errors[item] = floor
+            heapq.heappush(self._heap, (self.counts[item], item))
+
+    def top(self, k):
+        """(item, estimated value, max overestimate) triples, largest first."""
+        return [(item, value, self.errors[item])
+                for item, value in heapq.nlargest(k, self.counts.items(), key=lambda kv: kv[1])]
+
+
+class TopKIndex:
+    """
+    Best-selling products by revenue, quantity or profit, globally and per Region and Channel,
+    maintained per transaction (each applied once, tracked by TransactionID). In approximate mode
+    each list is a bounded Space-Saving summary instead of a counter per product.
+    """
+
+    def __init__(self, mode=TOPK_MODE, capacity=TOPK_CAPACITY):
+        self._lock = threading.Lock()
+        self.mode = mode
+        self.capacity = capacity
+        self.watermark = 0  # Highest TransactionID applied so far
+        self.counters = {}  # (dimension, group, metric) -> counter
+
+    def _counter(self, dimension, group, metric):
+        key = (dimension, group, metric)
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters[key] = SpaceSaving(self.capacity) if self.mode == "approximate" else ExactCounter()
+        return counter
+
+    def _apply(self, product, region, channel, revenue, quantity, profit):
+        weights = {"revenue": revenue, "quantity": quantity, "profit": profit}
+        for dimension, group in (("global", None), ("region", region), ("channel", channel)):
+            if dimension != "global" and not isinstance(group, str):
+                continue  # Missing region/channel
+            for metric in METRICS:
+                self._counter(dimension, group, metric).add(product, weights[metric])
+
+    def add(self, record):
+        """Applies a single transaction dict. Returns True if it was new."""
+        txn_id = record.get('TransactionID')
+        product = record.get('ProductID')
+        if txn_id is None or product is None:
+            return False
+        revenue = float(record.get('TotalPrice') or 0.0)
+        cost = record.get('TotalCost')
+        cost = float(cost) if cost is not None else revenue * 0.7
+        with self._lock:
+            if not aggregates.is_next(int(txn_id), self.watermark):
+                return False
+            self.watermark = int(txn_id)
+            self._apply(product, record.get('Region'), record.get('Channel'),
+                        revenue, int(record.get('Quantity') or 0), revenue - cost)
+        return True
+
+    def add_frame(self, df):
+        """Applies the rows of `df` (sorted by TransactionID) newer than the watermark, pre-summed per product/region/channel. Returns how many."""
+        if df.empty or 'TransactionID' not in df.columns:
+            return 0
+        with self._lock:
+            new_rows = aggregates.rows_after(df, self.watermark)
+            if new_rows.empty:
+                return 0
+            sums = (new_rows.assign(Profit=new_rows['TotalPrice'] - new_rows['TotalCost'])
+                    .groupby(['ProductID', 'Region', 'Channel'], dropna=False, observed=True)[['TotalPrice', 'Quantity', 'Profit']]
+                    .sum())
+            for (product, region, channel), revenue, quantity, profit in sums.itertuples(name=None):
+                self._apply(product, region, channel, float(revenue), int(quantity), float(profit))
+            self.watermark = int(new_rows['TransactionID'].iat[-1])
+            return len(new_rows)
+
+    def groups(self, dimension):
+        with self._lock:
+            return sorted({group for dim, group, _ in self.counters if dim == dimension and group is not None})
+
+    def top(self, k=5, metric="revenue", dimension="global", group=None):
+        """(ProductID, value, error) triples for one list, largest first."""
+        with self._lock:
+            counter = self.counters.get((dimension, group, metric))
+            return counter.top(k) if counter is not None else []
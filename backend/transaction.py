@@ -4,7 +4,10 @@ from datetime import datetime, timedelta
 import os
 import time
 import random
-import json
+import csv
+import glob
+
+import metrics
 
 # Configuration
 CSV_FILENAME = 'sales_transactions.csv'
@@ -13,6 +16,20 @@ NUM_PRODUCTS = 50
 MIN_PRICE = 10.0
 MAX_PRICE = 500.0
 REGIONS = ['North', 'South', 'East', 'West', 'Central']
+CHANNELS = ['Webstore', 'Shop A', 'Shop B']
+
+# Append-only log settings
+CSV_COLUMNS = ['TransactionID', 'Timestamp', 'ProductID', 'Quantity', 'PricePerUnit',
+               'CostPerUnit', 'TotalPrice', 'TotalCost', 'Region', 'Channel']
+LOG_SEGMENT_MAX_BYTES = int(os.environ.get("LOG_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+LOG_ROTATE_DAILY = os.environ.get("LOG_ROTATE_DAILY", "1") != "0"
+LOG_FSYNC_EVERY = int(os.environ.get("LOG_FSYNC_EVERY", "20"))            # rows
+LOG_FSYNC_INTERVAL = float(os.environ.get("LOG_FSYNC_INTERVAL", "5.0"))   # seconds
+
+# Generator loop settings
+GENERATION_INTERVAL = float(os.environ.get("GENERATION_INTERVAL", "5.0"))   # seconds between transactions
+PAUSED_RECHECK_SECONDS = 30.0  # Safety net while paused; pause/resume normally arrive as notifications
+GENERATOR_METRICS_PORT = int(os.environ.get("GENERATOR_METRICS_PORT", "0"))  # Serves /metrics for the generator; 0 disables
 
 # Wears / Clothing Items
 WEARS = [
@@ -23,6 +40,23 @@ WEARS = [
     "Maxi Skirt", "Aviator Sunglasses", "Leather Belt", "Beanie Hat"
 ]
 
+# Callbacks fed every new transaction (e.g. the backend's aggregate store when running in-process)
+TRANSACTION_LISTENERS = []
+
+def register_listener(callback):
+    """Registers a callable that receives each newly generated transaction record."""
+    if callback not in TRANSACTION_LISTENERS:
+        TRANSACTION_LISTENERS.append(callback)
+
+def notify_listeners(record):
+    """Feeds one transaction record to every registered listener."""
+    for callback in TRANSACTION_LISTENERS:
+        try:
+            callback(record)
+        except Exception as e:
+            metrics.inc("listener_errors_total")
+            print(f"Error in transaction listener: {e}")
+
 def generate_single_transaction(transaction_id, current_time):
     # product_id = f"p{np.random.randint(1, NUM_PRODUCTS + 1):03d}"
     # Use real product names now
@@ -34,7 +68,7 @@ def generate_single_transaction(transaction_id, current_time):
     total_price = round(quantity * price_per_unit, 2)
     total_cost = round(quantity * cost_per_unit, 2)
     region = np.random.choice(REGIONS)
-    channel = np.random.choice(['Webstore', 'Shop A', 'Shop B'])
+    channel = np.random.choice(CHANNELS)
 
     return {
         'TransactionID': int(transaction_id),
@@ -49,14 +83,201 @@ def generate_single_transaction(transaction_id, current_time):
         'Channel': str(channel)
     }
 
+def generate_transaction_batch(n, start_id, start_time=None, spacing_seconds=0.0, rng=None):
+    """
+    Builds n transactions at once as NumPy column arrays (keys = CSV_COLUMNS), with the same
+    distributions as generate_single_transaction. Timestamps start at `start_time` and are
+    `spacing_seconds` apart. Pass a seeded np.random.Generator for reproducible batches.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    start_time = np.datetime64(start_time or datetime.now(), 'us')
+
+    quantity = rng.integers(1, 10, n)
+    price_per_unit = np.round(rng.uniform(MIN_PRICE, MAX_PRICE, n), 2)
+    cost_per_unit = np.round(price_per_unit * rng.uniform(0.5, 0.8, n), 2)
+    offsets = (np.arange(n) * spacing_seconds * 1e6).astype('timedelta64[us]')
+
+    return {
+        'TransactionID': np.arange(start_id, start_id + n, dtype=np.int64),
+        'Timestamp': start_time + offsets,
+        'ProductID': np.asarray(WEARS)[rng.integers(0, len(WEARS), n)],
+        'Quantity': quantity,
+        'PricePerUnit': price_per_unit,
+        'CostPerUnit': cost_per_unit,
+        'TotalPrice': np.round(quantity * price_per_unit, 2),
+        'TotalCost': np.round(quantity * cost_per_unit, 2),
+        'Region': np.asarray(REGIONS)[rng.integers(0, len(REGIONS), n)],
+        'Channel': np.asarray(CHANNELS)[rng.integers(0, len(CHANNELS), n)],
+    }
+
+def batch_to_frame(batch):
+    return pd.DataFrame(batch, columns=CSV_COLUMNS)
+
+def batch_to_records(batch):
+    """Converts a column batch into record dicts (the shape generate_single_transaction returns)."""
+    return batch_to_frame(batch).to_dict(orient='records')
+
+def log_segments(path=CSV_FILENAME):
+    """All segments of the transaction log, oldest first (rotated segments, then the active file)."""
+    base, ext = os.path.splitext(path)
+    segments = sorted(glob.glob(f"{base}.*{ext}"))
+    if os.path.exists(path):
+        segments.append(path)
+    return segments
+
+def _last_transaction_id(path):
+    """Reads the TransactionID of the last row by seeking to the file tail (no full parse)."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        first_field = line.split(b',', 1)[0].strip()
+        if first_field.isdigit():
+            return int(first_field)
+    return None
+
+class TransactionLog:
+    """
+    Append-only CSV transaction log.
+    Keeps one open handle, hands out monotonic TransactionIDs (recovered from the log tail
+    at startup), rotates the active file into dated segments by size or day, and batches
+    fsyncs by row count / elapsed time. Appending costs the same regardless of history size.
+    """
+
+    def __init__(self, path=CSV_FILENAME, max_bytes=LOG_SEGMENT_MAX_BYTES, rotate_daily=LOG_ROTATE_DAILY,
+                 fsync_every=LOG_FSYNC_EVERY, fsync_interval=LOG_FSYNC_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._fh = None
+        self._writer = None
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        self.next_id = self._recover_next_id()
+        self._open()
+
+    def _recover_next_id(self):
+        for segment in reversed(log_segments(self.path)):
+            last_id = _last_transaction_id(segment)
+            if last_id is not None:
+                return last_id + 1
+        return 1
+
+    def _open(self):
+        self._fh = open(self.path, 'a', newline='')
+        self._writer = csv.writer(self._fh)
+        if self._fh.tell() == 0:
+            self._writer.writerow(CSV_COLUMNS)
+            self._fh.flush()
+        self._segment_day = datetime.fromtimestamp(os.path.getmtime(self.path)).date()
+
+    def _segment_name(self):
+        base, ext = os.path.splitext(self.path)
+        stamp = self._segment_day.strftime('%Y%m%d')
+        n = 1
+        while os.path.exists(f"{base}.{stamp}-{n:03d}{ext}"):
+            n += 1
+        return f"{base}.{stamp}-{n:03d}{ext}"
+
+    def _rotate(self):
+        self.flush(fsync=True)
+        self._fh.close()
+        os.replace(self.path, self._segment_name())
+        self._open()
+
+    def _needs_rotation(self, now):
+        if self._fh.tell() >= self.max_bytes:
+            return True
+        return self.rotate_daily and now.date() != self._segment_day
+
+    def allocate_id(self):
+        """Returns the next TransactionID."""
+        txn_id = self.next_id
+        self.next_id += 1
+        return txn_id
+
+    def append(self, record):
+        """Appends one transaction row; fsyncs once per batch rather than per row."""
+        now = datetime.now()
+        if self._needs_rotation(now):
+            self._rotate()
+        self._segment_day = now.date()
+        self._writer.writerow([record.get(col) for col in CSV_COLUMNS])
+        self._pending += 1
+        self.next_id = max(self.next_id, int(record['TransactionID']) + 1)
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self.flush(fsync=True)
+        else:
+            self._fh.flush()
+
+    def append_batch(self, batch):
+        """Appends a column batch from generate_transaction_batch in one write."""
+        now = datetime.now()
+        if self._needs_rotation(now):
+            self._rotate()
+        self._segment_day = now.date()
+        timestamps = np.char.replace(np.datetime_as_string(batch['Timestamp'], unit='us'), 'T', ' ')
+        columns = [timestamps if col == 'Timestamp' else batch[col] for col in CSV_COLUMNS]
+        self._writer.writerows(zip(*(column.tolist() for column in columns)))
+        self._pending += len(timestamps)
+        if len(timestamps):
+            self.next_id = max(self.next_id, int(batch['TransactionID'][-1]) + 1)
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self.flush(fsync=True)
+        else:
+            self._fh.flush()
+
+    def flush(self, fsync=False):
+        if self._fh is None:
+            return
+        self._fh.flush()
+        if fsync and self._pending:
+            os.fsync(self._fh.fileno())
+            self._pending = 0
+            self._last_fsync = time.monotonic()
+
+    def close(self):
+        if self._fh is not None:
+            self.flush(fsync=True)
+            self._fh.close()
+            self._fh = None
+
 def initialize_data():
-    if os.path.exists(CSV_FILENAME):
+    """
+    Loads the full local history; generates initial data if there is none.
+    Days already migrated to the columnar store are read from Parquet; only CSV log
+    segments with newer rows are parsed.
+    """
+    frames = []
+    stored_max_id = 0
+    import columnar_store
+    if columnar_store.is_available() and os.path.isdir(columnar_store.HISTORY_DIR):
+        store = columnar_store.ColumnarStore()
+        stored_max_id = store.max_transaction_id()
+        frames.append(store.read())
+
+    for segment in log_segments(CSV_FILENAME):
+        last_id = _last_transaction_id(segment)
+        if last_id is not None and last_id <= stored_max_id:
+            continue # Already in the columnar store
         try:
-            df = pd.read_csv(CSV_FILENAME)
-            # print(f"Loaded {len(df)} transactions from {CSV_FILENAME}")
-            return df
+            segment_df = pd.read_csv(segment)
+            frames.append(segment_df[segment_df['TransactionID'] > stored_max_id])
         except Exception as e:
             print(f"Error reading CSV: {e}")
+
+    frames = [frame for frame in frames if not frame.empty]
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+        # print(f"Loaded {len(df)} transactions from {CSV_FILENAME}")
+        return df
     
     print("Generating initial data...")
     initial_transactions_list = []
@@ -68,45 +289,171 @@ def initialize_data():
     df.to_csv(CSV_FILENAME, index=False)
     return df
 
-def generate_new_transaction(df):
-    last_transaction_id = df['TransactionID'].max() if not df.empty else 0
-    new_transaction_id = last_transaction_id + 1
+def generate_new_transaction(log, spool=None):
+    """
+    Generates the next transaction, appends it to the local log and syncs it. Returns the record.
+    With a spool the Supabase write is queued for the background sync worker instead of done inline.
+    """
     current_time = datetime.now()
-    
-    new_transaction = generate_single_transaction(new_transaction_id, current_time)
-    new_df_row = pd.DataFrame([new_transaction])
-    
-    updated_df = pd.concat([df, new_df_row], ignore_index=True)
+    new_transaction = generate_single_transaction(log.allocate_id(), current_time)
     
     import db_utils
-    # Keep file size manageable? For now just append.
-    # In a real app we might append to file without rewriting everything, but for this demo rewriting is safer for concurrency if low volume.
-    updated_df.to_csv(CSV_FILENAME, index=False)
+    # O(1) append to the active log segment (no rewrite of the history)
+    log.append(new_transaction)
     
     # Sync to Supabase
-    db_utils.insert_transaction(new_transaction)
+    with metrics.stage("generator_sync"):
+        if spool is not None:
+            if db_utils.STORAGE_BACKEND != "supabase":
+                # Local storage serves the dashboard; the spool still syncs the row to the cloud
+                db_utils.insert_transaction(new_transaction)
+            spool.enqueue(new_transaction)
+        else:
+            db_utils.insert_transaction(new_transaction)
+
+    notify_listeners(new_transaction)
+    metrics.inc("transactions_generated_total", mode="pipeline")
     
-    return updated_df
+    return new_transaction
 
-if __name__ == "__main__":
-    df = initialize_data()
+# Load generation sinks: each takes column batches from generate_transaction_batch
+class LogSink:
+    """Appends batches to the local append-only log."""
+    def __init__(self, log):
+        self.log = log
+    def write(self, batch):
+        self.log.append_batch(batch)
+    def close(self):
+        self.log.close()
+
+class SupabaseSink:
+    """Bulk-upserts batches into Supabase."""
+    def __init__(self, chunk_size=1000):
+        import db_utils
+        self.db_utils = db_utils
+        self.chunk_size = chunk_size
+    def write(self, batch):
+        records = batch_to_records(batch)
+        for i in range(0, len(records), self.chunk_size):
+            self.db_utils.upsert_transactions(records[i:i + self.chunk_size])
+    def close(self):
+        pass
+
+class ApiSink:
+    """POSTs batches to the backend's /api/transactions ingest endpoint."""
+    def __init__(self, url):
+        self.url = url.rstrip('/') + '/api/transactions'
+    def write(self, batch):
+        from urllib import request as urlrequest
+        body = batch_to_frame(batch).to_json(orient='records', date_format='iso').encode()
+        req = urlrequest.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        urlrequest.urlopen(req, timeout=30).read()
+    def close(self):
+        pass
+
+def run_load_generator(sink, rate, duration, seed=None, start_id=None, tick=0.1):
+    """
+    Streams generated transactions into `sink` at `rate` rows/second for `duration` seconds.
+    Rows are produced in per-tick batches; the loop sleeps to hold the target rate.
+    Returns (rows written, achieved rows/second).
+    """
+    rng = np.random.default_rng(seed)
+    next_id = start_id or 1
+    per_tick = max(1, int(round(rate * tick)))
+    started = time.perf_counter()
+    deadline = started + duration
+    written = 0
+    last_report = started
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        batch = generate_transaction_batch(per_tick, next_id, datetime.now(), 1.0 / rate, rng)
+        with metrics.stage("loadgen_write"):
+            sink.write(batch)
+        metrics.inc("transactions_generated_total", per_tick, mode="loadgen")
+        next_id += per_tick
+        written += per_tick
+
+        now = time.perf_counter()
+        if now - last_report >= 1.0:
+            print(f"{written} rows, {written / (now - started):,.0f} rows/s", end='\r')
+            last_report = now
+        # Hold the target rate: sleep until this batch's scheduled end
+        scheduled = started + written / rate
+        if scheduled > now:
+            time.sleep(scheduled - now)
+    elapsed = time.perf_counter() - started
+    sink.close()
+    return written, written / elapsed if elapsed else 0.0
+
+def run_pipeline():
+    """The regular generator: one transaction every 5 seconds, synced through the spool."""
+    if not log_segments(CSV_FILENAME):
+        initialize_data()
+    log = TransactionLog(CSV_FILENAME)
+    import db_utils
+    from sync_spool import SyncSpool
+    db_utils.run_startup_migrations()
+    spool = SyncSpool(storage=db_utils.get_storage("supabase"))
+    spool.start()
+    control = db_utils.get_pipeline_control()
+    control.listen()
+    if GENERATOR_METRICS_PORT:
+        metrics.serve(GENERATOR_METRICS_PORT)
     print("Starting data generation loop...")
+    next_at = time.monotonic()
     try:
         while True:
-            # Check pipeline status
-            try:
-                if os.path.exists('pipeline_status.json'):
-                    with open('pipeline_status.json', 'r') as f:
-                        status_data = json.load(f)
-                        if not status_data.get('active', True):
-                            print("Pipeline is paused. Waiting...", end='\r')
-                            time.sleep(2)
-                            continue
-            except Exception as e:
-                print(f"Error reading status: {e}")
-
-            df = generate_new_transaction(df)
-            print(f"Generated transaction {df['TransactionID'].max()}               ")
-            time.sleep(5)
+            # Paused: block until the control channel says otherwise (pause/resume arrive as notifications)
+            if not control.is_active():
+                print("Pipeline is paused. Waiting...", end='\r')
+                control.wait(PAUSED_RECHECK_SECONDS)
+                next_at = time.monotonic()
+                continue
+
+            now = time.monotonic()
+            if now < next_at:
+                control.wait(next_at - now)
+                continue
+
+            new_transaction = generate_new_transaction(log, spool)
+            print(f"Generated transaction {new_transaction['TransactionID']} (sync queue: {spool.depth()})      ")
+            next_at = now + GENERATION_INTERVAL
     except KeyboardInterrupt:
         print("Stopped.")
+    finally:
+        control.close()
+        log.close()
+        spool.stop()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sales transaction generator")
+    subparsers = parser.add_subparsers(dest="command")
+    loadgen = subparsers.add_parser("loadgen", help="Stream generated transactions at a target rate")
+    loadgen.add_argument("--rate", type=float, default=10000, help="Target rows per second")
+    loadgen.add_argument("--duration", type=float, default=10, help="Seconds to run")
+    loadgen.add_argument("--seed", type=int, default=42, help="RNG seed (fixed for reproducible runs)")
+    loadgen.add_argument("--sink", choices=["log", "supabase", "api"], default="log")
+    loadgen.add_argument("--log-path", default="loadgen_transactions.csv", help="Log file for --sink log")
+    loadgen.add_argument("--api-url", default="http://127.0.0.1:5000", help="Backend URL for --sink api")
+    args = parser.parse_args()
+
+    if args.command == "loadgen":
+        if args.sink == "log":
+            sink_log = TransactionLog(args.log_path)
+            start_id = sink_log.next_id
+            sink = LogSink(sink_log)
+        else:
+            # Continue after the stored rows: reused IDs would overwrite them and be skipped by every watermark
+            import db_utils
+            max_id = db_utils.get_max_transaction_id()
+            if max_id is None:
+                raise SystemExit("Could not read the current max TransactionID from storage")
+            start_id = max_id + 1
+            sink = SupabaseSink() if args.sink == "supabase" else ApiSink(args.api_url)
+        written, achieved = run_load_generator(sink, args.rate, args.duration, args.seed, start_id)
+        print(f"\nWrote {written} rows to {args.sink}: {achieved:,.0f} rows/s achieved (target {args.rate:,.0f})")
+    else:
+        run_pipeline()
@@ -0,0 +1,170 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Configuration
+TRANSACTION_BUFFER_CAPACITY = int(os.environ.get("TRANSACTION_BUFFER_CAPACITY", "10000000"))  # rows kept per worker
+INITIAL_ALLOCATION = 65536  # rows; grows by doubling up to capacity + slack
+
+# Fixed-width columns: int64 ids and epoch-nanosecond timestamps, float64 money (float32 rounding
+# drifts the sums over millions of rows), dictionary codes for the categoricals
+NUMERIC_COLUMNS = {
+    "TransactionID": np.int64,
+    "Timestamp": np.int64,
+    "Quantity": np.int32,
+    "PricePerUnit": np.float64,
+    "CostPerUnit": np.float64,
+    "TotalPrice": np.float64,
+    "TotalCost": np.float64,
+}
+CATEGORICAL_COLUMNS = {
+    "ProductID": np.int16,
+    "Region": np.int8,
+    "Channel": np.int8,
+}
+COLUMN_ORDER = ['TransactionID', 'Timestamp', 'ProductID', 'Quantity', 'PricePerUnit',
+                'CostPerUnit', 'TotalPrice', 'TotalCost', 'Region', 'Channel']
+
+
+class TransactionBuffer:
+    """
+    The most recent `capacity` transactions as preallocated NumPy columns instead of an
+    object-dtype DataFrame: about 56 bytes per row. ProductID/Region/Channel are stored as small
+    integer codes into per-column dictionaries. Rows live in [start, end) of each array, so
+    frame() hands out zero-copy views (timestamps as datetime64, categoricals from codes).
+    Appends only write past `end` and relocation always goes to fresh arrays, so views handed out
+    earlier are never modified underneath their holders. Past capacity the oldest rows are dropped.
+    """
+
+    def __init__(self, capacity=TRANSACTION_BUFFER_CAPACITY):
+        self.capacity = capacity
+        self.slack = max(capacity // 8, 1)  # Room to append before the live rows are moved back to the front
+        self._lock = threading.Lock()
+        self.dictionaries = {name: [] for name in CATEGORICAL_COLUMNS}
+        self._codes = {name: {} for name in CATEGORICAL_COLUMNS}
+        self.start = 0
+        self.end = 0
+        self.dropped = 0
+        self.columns = None
+        self._allocate(min(INITIAL_ALLOCATION, capacity + self.slack))
+
+    def _allocate(self, rows):
+        """Moves the live rows to the front of freshly allocated arrays of `rows` rows."""
+        columns = {}
+        for name, dtype in {**NUMERIC_COLUMNS, **CATEGORICAL_COLUMNS}.items():
+            column = np.empty(rows, dtype=dtype)
+            if self.columns is not None:
+                column[:self.end - self.start] = self.columns[name][self.start:self.end]
+            columns[name] = column
+        self.end -= self.start
+        self.start = 0
+        self.columns = columns
+        self.allocated = rows
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _encode(self, name, values):
+        """Dictionary-encodes a column; unseen values get the next code, missing values -1."""
+        codes = self._codes[name]
+        dictionary = self.dictionaries[name]
+        inverse, uniques = pd.factorize(values, use_na_sentinel=True)
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, value in enumerate(uniques):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(dictionary)
+                dictionary.append(value)
+            mapping[i] = code
+        encoded = np.full(len(inverse), -1, dtype=np.int64)
+        present = inverse >= 0
+        encoded[present] = mapping[inverse[present]]
+        limit = np.iinfo(CATEGORICAL_COLUMNS[name]).max
+        if len(dictionary) > limit:
+            raise OverflowError(f"{name} has more than {limit} distinct values")
+        return encoded
+
+    def append_frame(self, df):
+        """Appends the rows of a normalized transactions frame. Returns how many were appended."""
+        n = len(df)
+        if n == 0:
+            return 0
+        if n > self.capacity:
+            df = df.iloc[n - self.capacity:]
+            self.dropped += n - self.capacity
+            n = self.capacity
+
+        timestamps = pd.to_datetime(df['Timestamp'])
+        if getattr(timestamps.dt, 'tz', None) is not None:
+            timestamps = timestamps.dt.tz_localize(None)
+        values = {"Timestamp": timestamps.to_numpy(dtype='datetime64[ns]').view(np.int64)}
+        for name in NUMERIC_COLUMNS:
+            if name == "Timestamp":
+                continue
+            if name in df.columns:
+                values[name] = df[name].to_numpy(dtype=np.float64 if name != "TransactionID" else np.int64,
+                                                 na_value=0 if name in ("TransactionID", "Quantity") else np.nan)
+            else:
+                values[name] = np.full(n, np.nan)
+
+        with self._lock:
+            for name in CATEGORICAL_COLUMNS:
+                values[name] = self._encode(name, df[name].to_numpy(dtype=object) if name in df.columns
+                                            else np.full(n, None, dtype=object))
+
+            # Drop the oldest rows past capacity, then make room at the end
+            overflow = len(self) + n - self.capacity
+            if overflow > 0:
+                self.start += overflow
+                self.dropped += overflow
+            if self.end + n > self.allocated:
+                needed = len(self) + n
+                target = self.allocated
+                while target < needed:
+                    target *= 2
+                self._allocate(min(max(target, needed), self.capacity + self.slack))
+
+            for name, column in self.columns.items():
+                column[self.end:self.end + n] = values[name]
+            self.end += n
+        return n
+
+    def frame(self):
+        """The live rows as a DataFrame of zero-copy views (read-only by convention)."""
+        with self._lock:
+            start, end, columns = self.start, self.end, self.columns
+            dictionaries = {name: list(values) for name, values in self.dictionaries.items()}
+        if start == end:
+            return pd.DataFrame()
+        data = {}
+        for name in COLUMN_ORDER:
+            view = columns[name][start:end]
+            if name == "Timestamp":
+                data[name] = view.view('datetime64[ns]')
+            elif name in CATEGORICAL_COLUMNS:
+                data[name] = pd.Categorical.from_codes(view, categories=dictionaries[name], validate=False)
+            else:
+                data[name] = view
+        return pd.DataFrame(data, copy=False)
+
+    def stats(self):
+        row_bytes = sum(np.dtype(dtype).itemsize for dtype in {**NUMERIC_COLUMNS, **CATEGORICAL_COLUMNS}.values())
+        with self._lock:
+            rows = len(self)
+            return {
+                "name": "transaction_buffer",
+                "rows": rows,
+                "capacity": self.capacity,
+                "allocated_rows": self.allocated,
+                "dropped_rows": self.dropped,
+                "row_bytes": row_bytes,
+                "allocated_bytes": row_bytes * self.allocated,
+                "bytes_per_row": (row_bytes * self.allocated / rows) if rows else None,
+                "distinct_values": {name: len(values) for name, values in self.dictionaries.items()},
+            }
+
+    def clear(self):
+        with self._lock:
+            self.start = self.end = 0
@@ -1,9 +1,19 @@
+import os
+import sys
 import pandas as pd
+sys.path.insert(0, 'backend')
 try:
-    df = pd.read_csv('backend/sales_transactions.csv')
+    import columnar_store
+    if columnar_store.is_available() and os.path.isdir('backend/history'):
+        # Only the two columns we need, memory-mapped from the day partitions
+        df = columnar_store.ColumnarStore('backend/history').read(columns=['Channel', 'TotalPrice'])
+    else:
+        df = pd.DataFrame()
+    if df.empty:
+        df = pd.read_csv('backend/sales_transactions.csv')
     print("Unique Channels:", df['Channel'].unique())
     
-    channel_sales = df.groupby('Channel')['TotalPrice'].sum().reset_index()
+    channel_sales = df.groupby('Channel', observed=True)['TotalPrice'].sum().reset_index()
     print("Aggregated Sales List:")
     for index, row in channel_sales.iterrows():
         print(f"{row['Channel']}: {row['TotalPrice']}")
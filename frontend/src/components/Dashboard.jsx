@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 import { API_BASE_URL } from '../apiConfig';
+import { subscribeLive } from '../liveStream';
 import { Link } from 'react-router-dom';
 import KPICard from './KPICard';
 import { TrendChart, ChannelChart, ProfitScatter, RegionChart } from './DashboardCharts';
@@ -28,8 +29,13 @@ const Dashboard = () => {
 
     useEffect(() => {
         fetchData();
-        const interval = setInterval(fetchData, 5000); // Poll every 5 seconds
-        return () => clearInterval(interval);
+        // Server pushes changes; polls every 5 seconds only while the stream is down
+        return subscribeLive((live) => {
+            if (!live.dashboard) return;
+            setData(live.dashboard);
+            setLastUpdated(new Date());
+            setLoading(false);
+        }, fetchData, 5000);
     }, []);
 
     if (loading && !data) {
@@ -3,6 +3,7 @@ import { Link } from 'react-router-dom';
 import { LayoutDashboard, Package, ArrowRight, TrendingUp, Zap } from 'lucide-react';
 import axios from 'axios';
 import { API_BASE_URL } from '../apiConfig';
+import { subscribeLive } from '../liveStream';
 
 const Home = () => {
     const [bestSellers, setBestSellers] = useState([]);
@@ -15,8 +16,8 @@ const Home = () => {
         };
 
         fetchBestSellers(); // Initial fetch
-        const interval = setInterval(fetchBestSellers, 2000); // Poll every 2 seconds for "real-time" feel
-        return () => clearInterval(interval);
+        // Server pushes changes; polls every 2 seconds only while the stream is down
+        return subscribeLive((live) => setBestSellers(live.best_sellers || []), fetchBestSellers, 2000);
     }, []);
 
     return (
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 import { API_BASE_URL } from '../apiConfig';
+import { subscribeLive } from '../liveStream';
 import { ArrowLeft, Package, AlertTriangle, CheckCircle, XCircle, PlusCircle } from 'lucide-react';
 import { Link } from 'react-router-dom';
 
@@ -14,9 +15,8 @@ const Inventory = () => {
 
     const fetchInventory = async () => {
         try {
-            const response = await axios.get(`${API_BASE_URL}/api/inventory`, {
-                params: { _t: new Date().getTime() }
-            });
+            // No cache-busting param: the backend's ETag lets the browser revalidate cheaply (304)
+            const response = await axios.get(`${API_BASE_URL}/api/inventory`);
             setInventory(response.data);
         } catch (error) {
             console.error("Error fetching inventory:", error);
@@ -27,8 +27,12 @@ const Inventory = () => {
 
     useEffect(() => {
         fetchInventory();
-        const interval = setInterval(fetchInventory, 5000);
-        return () => clearInterval(interval);
+        // Server pushes changes; polls every 5 seconds only while the stream is down
+        return subscribeLive((live) => {
+            if (!live.inventory) return;
+            setInventory(live.inventory);
+            setLoading(false);
+        }, fetchInventory, 5000);
     }, []);
 
     const openRestockModal = (product) => {
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 import { API_BASE_URL } from '../apiConfig';
+import { subscribeLive } from '../liveStream';
 import { Link, useNavigate } from 'react-router-dom';
 import { Home as HomeIcon, Printer, TrendingUp, Target, BarChart2, PieChart, Lock } from 'lucide-react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip as RechartsTooltip, ResponsiveContainer, BarChart, Bar, Legend, Cell } from 'recharts';
@@ -30,8 +31,12 @@ const StrategyHub = () => {
         };
 
         fetchData(); // Initial fetch
-        const interval = setInterval(fetchData, 3000); // Poll every 3 seconds
-        return () => clearInterval(interval);
+        // Server pushes changes; polls every 3 seconds only while the stream is down
+        return subscribeLive((live) => {
+            if (!live.dashboard) return;
+            setData(live.dashboard);
+            setLoading(false);
+        }, fetchData, 3000);
     }, []);
 
     const handleExportClick = () => {
@@ -0,0 +1,96 @@
+// Shared Server-Sent Events connection to /api/stream.
+// The backend sends a full snapshot on connect and then only the changes,
+// so pages re-render when data actually changes instead of polling on a timer.
+import { API_BASE_URL } from './apiConfig';
+
+let source = null;
+let state = null;
+let connected = false;
+const listeners = new Set();
+
+const getPath = (root, path) => path.split('.').reduce((node, part) => (node ? node[part] : undefined), root);
+
+const setPath = (root, path, value) => {
+    const parts = path.split('.');
+    const last = parts.pop();
+    const parent = parts.reduce((node, part) => (node[part] = node[part] || {}), root);
+    parent[last] = value;
+};
+
+const applyChange = (root, change) => {
+    if ('replace' in change) {
+        setPath(root, change.path, change.replace);
+    } else if ('merge' in change) {
+        setPath(root, change.path, { ...(getPath(root, change.path) || {}), ...change.merge });
+    } else {
+        const removed = new Set(change.remove);
+        const rows = (getPath(root, change.path) || []).filter(row => !removed.has(row[change.key]));
+        change.upsert.forEach(row => {
+            const index = rows.findIndex(existing => existing[change.key] === row[change.key]);
+            if (index >= 0) rows[index] = row;
+            else rows.push(row);
+        });
+        if (change.path === 'inventory') rows.sort((a, b) => a.remaining - b.remaining); // Critical first
+        setPath(root, change.path, rows);
+    }
+};
+
+const notify = () => listeners.forEach(listener => listener.onState(state));
+
+const setConnected = (value) => {
+    connected = value;
+    listeners.forEach(listener => listener.onConnection(value));
+};
+
+const open = () => {
+    source = new EventSource(`${API_BASE_URL}/api/stream`);
+    source.addEventListener('snapshot', (event) => {
+        state = JSON.parse(event.data);
+        setConnected(true);
+        notify();
+    });
+    source.addEventListener('delta', (event) => {
+        if (!state) return;
+        const next = structuredClone(state);
+        JSON.parse(event.data).changes.forEach(change => applyChange(next, change));
+        state = next;
+        notify();
+    });
+    // EventSource reconnects by itself; the new connection starts with a fresh snapshot
+    source.onerror = () => setConnected(false);
+};
+
+// Subscribes to live state. While the stream is down, `fallbackFetch` is polled every `fallbackInterval` ms.
+// Returns an unsubscribe function (suitable as a useEffect cleanup).
+export const subscribeLive = (onState, fallbackFetch, fallbackInterval) => {
+    let timer = null;
+    const onConnection = (isConnected) => {
+        if (isConnected && timer) {
+            clearInterval(timer);
+            timer = null;
+        } else if (!isConnected && !timer && fallbackFetch) {
+            timer = setInterval(fallbackFetch, fallbackInterval);
+        }
+    };
+    const listener = { onState, onConnection };
+    listeners.add(listener);
+
+    if (typeof EventSource === 'undefined') {
+        onConnection(false);
+    } else {
+        if (!source) open();
+        if (state) onState(state);
+        onConnection(connected);
+    }
+
+    return () => {
+        listeners.delete(listener);
+        if (timer) clearInterval(timer);
+        if (listeners.size === 0 && source) {
+            source.close();
+            source = null;
+            state = null;
+            connected = false;
+        }
+    };
+};